@@ -1,7 +1,160 @@
-from rest_framework import mixins, viewsets
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Max
+from django.db.models.signals import post_save, pre_save
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from posts.cache import digest
 
 
 class CreateListRetrieveViewSet(mixins.CreateModelMixin,
                                 mixins.ListModelMixin,
                                 viewsets.GenericViewSet):
     pass
+
+
+class ConditionalGetMixin:
+    """
+    ETag для list и retrieve. ETag считается из get_etag_parts()
+    до выборки объектов и сериализации, и на совпавший
+    If-None-Match вьюсет отвечает 304.
+    """
+    def get_etag_parts(self):
+        """
+        Строки, от которых зависит ответ, или None, если ETag
+        не нужен (например, объекта нет и ответ будет 404).
+        """
+        return None
+
+    def get_etag(self):
+        parts = self.get_etag_parts()
+        if parts is None:
+            return None
+        return quote_etag(digest([self.request.get_full_path(),
+                                  self.request.accepted_renderer.format,
+                                  *map(str, parts)]))
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag = self.get_etag()
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+def bulk_insert(model, objs):
+    """
+    bulk_create, после которого у объектов есть pk.
+    SQLite в Django 3.2 не возвращает ключи из bulk_create, но внутри
+    транзакции записи выдаёт ключи подряд, поэтому они восстанавливаются
+    по максимальному ключу таблицы.
+    """
+    using = router.db_for_write(model)
+    with transaction.atomic(using=using):
+        objs = model._default_manager.bulk_create(objs)
+        if objs and objs[0].pk is None:
+            last = (model._default_manager.db_manager(using)
+                    .aggregate(last=Max('pk'))['last'])
+            for pk, obj in enumerate(objs, start=last - len(objs) + 1):
+                obj.pk = pk
+                obj._state.adding = False
+                obj._state.db = using
+    return objs
+
+
+class BulkCreateMixin:
+    """
+    POST {list}/bulk/ со списком объектов. Объекты проверяются
+    сериализатором вьюсета и создаются одной транзакцией через
+    bulk_create. Ответ содержит результат по каждому элементу:
+    201 — все созданы, 207 — часть с ошибками, 400 — ни одного.
+    Сигналы post_save отправляются как при обычном сохранении,
+    поэтому счётчики, ленты и кэш обновляются.
+    """
+    def get_bulk_save_kwargs(self):
+        """
+        Поля, которые perform_create передаёт в serializer.save().
+        """
+        return {}
+
+    def get_bulk_unique_key(self, validated_data):
+        """
+        Ключ для поиска дубликатов внутри одного запроса
+        или None, если дубликаты допустимы.
+        """
+        return None
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'detail': 'Ожидается список объектов.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.API_BULK_MAX_ITEMS:
+            return Response(
+                {'detail': 'Не больше {} объектов за запрос.'.format(
+                    settings.API_BULK_MAX_ITEMS)},
+                status=status.HTTP_400_BAD_REQUEST)
+        save_kwargs = self.get_bulk_save_kwargs()
+        results = [None] * len(items)
+        valid = []
+        seen = set()
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if not serializer.is_valid():
+                results[index] = {'status': status.HTTP_400_BAD_REQUEST,
+                                  'errors': serializer.errors}
+                continue
+            data = {**serializer.validated_data, **save_kwargs}
+            key = self.get_bulk_unique_key(data)
+            if key is not None and key in seen:
+                results[index] = {
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': {'non_field_errors': [
+                        'Повторяет другой объект запроса.']},
+                }
+                continue
+            seen.add(key)
+            valid.append((index, serializer, data))
+        model = self.get_serializer_class().Meta.model
+        with transaction.atomic(using=router.db_for_write(model)):
+            instances = [model(**data) for _, _, data in valid]
+            for instance in instances:
+                pre_save.send(sender=model, instance=instance, raw=False,
+                              using=router.db_for_write(model),
+                              update_fields=None)
+            instances = bulk_insert(model, instances)
+            for instance in instances:
+                post_save.send(sender=model, instance=instance,
+                               created=True, raw=False,
+                               using=instance._state.db,
+                               update_fields=None)
+        for (index, serializer, _), instance in zip(valid, instances):
+            serializer.instance = instance
+            results[index] = {'status': status.HTTP_201_CREATED,
+                              'data': serializer.data}
+        failed = len(items) - len(instances)
+        if not failed:
+            response_status = status.HTTP_201_CREATED
+        elif instances:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': len(instances),
+                         'failed': failed,
+                         'results': results},
+                        status=response_status)
@@ -0,0 +1,28 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PostCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class PopularCursorPagination(PostCursorPagination):
+    ordering = ('-hot_score', '-id')
+
+
+class CommentCursorPagination(PostCursorPagination):
+    ordering = ('-created', '-id')
+
+
+class LikeCursorPagination(PostCursorPagination):
+    ordering = ('-post_id',)
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Результаты поиска упорядочены по релевантности,
+    поэтому делятся на страницы по номерам.
+    """
+    page_size_query_param = 'limit'
+    max_page_size = 100
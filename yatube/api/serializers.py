@@ -26,15 +26,119 @@ class GroupSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'slug', 'description')
 
 
+class AuthorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name')
+
+
+def split_param(request, name):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
 class PostSerializer(serializers.ModelSerializer):
+    """
+    GET-запросы принимают ?fields= — список полей ответа — и
+    ?expand= — поля, которые нужно развернуть во вложенный объект
+    (group, author) или добавить (comments_count, likes_count, hot_score).
+    Списки по умолчанию отдают начало текста (excerpt) вместо text.
+    Запрос к базе подстраивается под поля: optimize_queryset.
+    """
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True
     )
 
+    expandable = {
+        'group': lambda: GroupSerializer(read_only=True),
+        'author': lambda: AuthorSerializer(read_only=True),
+        'comments_count': lambda: serializers.IntegerField(read_only=True),
+        'likes_count': lambda: serializers.IntegerField(read_only=True),
+        'hot_score': lambda: serializers.FloatField(read_only=True),
+    }
+    # Столбцы, которые читает каждое поле ответа.
+    columns = {
+        'id': ('id',),
+        'text': ('text',),
+        'excerpt': ('excerpt',),
+        'author': ('author__username',),
+        'image': ('image',),
+        'group': ('group',),
+        'pub_date': ('pub_date',),
+        'comments_count': ('comments_count',),
+        'likes_count': ('likes_count',),
+        'hot_score': ('hot_score',),
+    }
+    expanded_columns = {
+        'group': ('group__title', 'group__slug', 'group__description'),
+        'author': ('author__username', 'author__first_name',
+                   'author__last_name'),
+    }
+
+    default_fields = ('id', 'text', 'author', 'image', 'group', 'pub_date')
+    list_fields = ('id', 'excerpt', 'author', 'image', 'group', 'pub_date')
+    list_actions = ('list', 'popular')
+
     class Meta:
         model = Post
-        fields = ('id', 'text', 'author', 'image', 'group', 'pub_date')
+        fields = ('id', 'text', 'excerpt', 'author', 'image', 'group',
+                  'pub_date')
+
+    @classmethod
+    def requested_fields(cls, request, action=None):
+        """
+        Пара (поля ответа, развёрнутые поля) из параметров запроса.
+        """
+        if request is None or request.method != 'GET':
+            return set(cls.Meta.fields), set()
+        fields = split_param(request, 'fields')
+        expand = split_param(request, 'expand') or set()
+        errors = {}
+        if fields is not None and fields - set(cls.columns):
+            errors['fields'] = 'Неизвестные поля: {}'.format(
+                ', '.join(sorted(fields - set(cls.columns))))
+        if expand - set(cls.expandable):
+            errors['expand'] = 'Нельзя развернуть: {}'.format(
+                ', '.join(sorted(expand - set(cls.expandable))))
+        if errors:
+            raise serializers.ValidationError(errors)
+        if fields is None:
+            fields = set(cls.list_fields if action in cls.list_actions
+                         else cls.default_fields)
+        return fields | expand, expand
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request, action=None,
+                          ordering=('pub_date', 'id')):
+        """
+        Читает только столбцы запрошенных полей и присоединяет
+        развёрнутые связи. Столбцы ordering нужны курсорной пагинации.
+        """
+        fields, expand = cls.requested_fields(request, action)
+        columns = set(ordering)
+        for name in fields:
+            if name in expand and name in cls.expanded_columns:
+                columns.update(cls.expanded_columns[name])
+            else:
+                columns.update(cls.columns[name])
+        related = {column.split('__')[0] for column in columns
+                   if '__' in column}
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, expand = self.requested_fields(
+            self.context.get('request'),
+            getattr(self.context.get('view'), 'action', None))
+        for name in expand:
+            self.fields[name] = self.expandable[name]()
+        for name in set(self.fields) - fields:
+            self.fields.pop(name)
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -42,7 +146,7 @@ class CommentSerializer(serializers.ModelSerializer):
         slug_field='username',
         read_only=True
     )
-    post = serializers.ReadOnlyField(source='post.id')
+    post = serializers.ReadOnlyField(source='post_id')
 
     class Meta:
         model = Comment
@@ -55,7 +159,7 @@ class FollowSerializer(serializers.ModelSerializer):
         read_only=True,
         default=serializers.CurrentUserDefault()
     )
-    following = serializers.SlugRelatedField(
+    author = serializers.SlugRelatedField(
         slug_field='username',
         queryset=User.objects.all()
     )
@@ -0,0 +1,247 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class BulkCreateTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.authors = [User.objects.create_user(username=f'author_{index}')
+                       for index in range(3)]
+        cls.group = Group.objects.create(title='test_title',
+                                         slug='test_slug')
+        cls.post = Post.objects.create(text='test_post', author=cls.user)
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(BulkCreateTest.user)
+
+    def test_bulk_posts(self):
+        """
+        Посты создаются пачкой, ошибки возвращаются по элементам,
+        а ленты подписчиков получают новые посты.
+        """
+        response = self.client.post('/api/v1/posts/bulk/', [
+            {'text': 'first', 'group': self.group.id},
+            {'text': ''},
+            {'text': 'second'},
+        ], format='json')
+        self.assertEqual(response.status_code, HTTPStatus.MULTI_STATUS)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 1)
+        first, failed, second = response.data['results']
+        self.assertEqual(failed['status'], HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', failed['errors'])
+        for result, text in ((first, 'first'), (second, 'second')):
+            self.assertEqual(result['status'], HTTPStatus.CREATED)
+            post = Post.objects.get(pk=result['data']['id'])
+            self.assertEqual(post.text, text)
+            self.assertEqual(result['data']['author'], 'auth_user')
+            self.assertTrue(TimelineEntry.objects.filter(
+                user=self.follower, post=post).exists())
+
+    def test_bulk_comments(self):
+        """
+        Комментарии пачкой обновляют счётчик поста.
+        """
+        response = self.client.post(
+            f'/api/v1/posts/{self.post.id}/comments/bulk/',
+            [{'text': f'comment {index}'} for index in range(3)],
+            format='json')
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        ids = [result['data']['id'] for result in response.data['results']]
+        self.assertEqual(
+            sorted(ids),
+            sorted(Comment.objects.filter(post=self.post)
+                   .values_list('id', flat=True)))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+
+    def test_bulk_follows(self):
+        """
+        Подписки пачкой: дубликаты и подписка на себя отклоняются.
+        """
+        response = self.client.post('/api/v1/follow/bulk/', [
+            {'author': 'author_0'},
+            {'author': 'author_1'},
+            {'author': 'author_0'},
+            {'author': 'auth_user'},
+            {'author': 'missing'},
+        ], format='json')
+        self.assertEqual(response.status_code, HTTPStatus.MULTI_STATUS)
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, [HTTPStatus.CREATED, HTTPStatus.CREATED,
+                                    HTTPStatus.BAD_REQUEST,
+                                    HTTPStatus.BAD_REQUEST,
+                                    HTTPStatus.BAD_REQUEST])
+        self.assertEqual(
+            set(Follow.objects.filter(user=self.user)
+                .values_list('author__username', flat=True)),
+            {'author_0', 'author_1'})
+
+    def test_bulk_all_failed(self):
+        """
+        Если не создан ни один объект, ответ — 400.
+        """
+        response = self.client.post('/api/v1/posts/bulk/',
+                                    [{'text': ''}], format='json')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(response.data['created'], 0)
+
+    @override_settings(API_BULK_MAX_ITEMS=2)
+    def test_bulk_rejects_bad_payload(self):
+        """
+        Запрос должен содержать список не длиннее предела.
+        """
+        for payload in ({'text': 'single'},
+                        [{'text': str(index)} for index in range(3)]):
+            response = self.client.post('/api/v1/posts/bulk/', payload,
+                                        format='json')
+            self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_bulk_requires_auth(self):
+        response = APIClient().post('/api/v1/posts/bulk/',
+                                    [{'text': 'anonymous'}], format='json')
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+
+class PostFieldsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user',
+                                            first_name='Имя')
+        cls.group = Group.objects.create(title='test_title',
+                                         slug='test_slug')
+        cls.post = Post.objects.create(text='test_post', author=cls.user,
+                                       group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.user, text='text')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get(self, query=''):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/v1/posts/{query}')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.data['results'][0], queries
+
+    def test_default_fields(self):
+        """
+        Список отдаёт начало текста и не читает text, пост — весь текст.
+        """
+        item, queries = self.get()
+        self.assertEqual(set(item), {'id', 'excerpt', 'author', 'image',
+                                     'group', 'pub_date'})
+        self.assertEqual(item['author'], 'auth_user')
+        self.assertEqual(item['group'], self.group.id)
+        self.assertNotIn('"posts_post"."text"', queries[0]['sql'])
+        response = self.client.get(f'/api/v1/posts/{self.post.id}/')
+        self.assertEqual(set(response.data), {'id', 'text', 'author',
+                                              'image', 'group', 'pub_date'})
+        item, _ = self.get('?fields=id,text')
+        self.assertEqual(item['text'], 'test_post')
+
+    def test_sparse_fields(self):
+        """
+        ?fields= сужает ответ и список столбцов запроса.
+        """
+        item, queries = self.get('?fields=id,pub_date')
+        self.assertEqual(set(item), {'id', 'pub_date'})
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertNotIn('"text"', sql)
+        self.assertNotIn('auth_user', sql)
+
+    def test_expand(self):
+        """
+        ?expand= разворачивает связи одним запросом.
+        """
+        item, queries = self.get(
+            '?expand=group,author,comments_count,likes_count')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(item['group'], {'id': self.group.id,
+                                         'title': 'test_title',
+                                         'slug': 'test_slug',
+                                         'description': ''})
+        self.assertEqual(item['author']['first_name'], 'Имя')
+        self.assertEqual(item['comments_count'], 1)
+        self.assertEqual(item['likes_count'], 0)
+        self.assertIn('excerpt', item)
+
+    def test_fields_with_expand(self):
+        item, _ = self.get('?fields=id&expand=group')
+        self.assertEqual(set(item), {'id', 'group'})
+        self.assertEqual(item['group']['slug'], 'test_slug')
+
+    def test_unknown_fields(self):
+        for query in ('?fields=id,secret', '?expand=text'):
+            response = self.client.get(f'/api/v1/posts/{query}')
+            self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user')
+        cls.group = Group.objects.create(title='test_title',
+                                         slug='test_slug')
+        cls.post = Post.objects.create(text='test_post', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.urls = [
+            '/api/v1/posts/',
+            f'/api/v1/posts/{self.post.id}/',
+            f'/api/v1/posts/{self.post.id}/comments/',
+            '/api/v1/groups/',
+            f'/api/v1/groups/{self.group.id}/',
+        ]
+
+    def test_not_modified(self):
+        """
+        На совпавший If-None-Match ответ 304 без выборки объектов.
+        """
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.assertLessEqual(len(queries), 1)
+
+    def test_changes_reset_etag(self):
+        """
+        Комментарий меняет версию поста, новый пост — список постов.
+        """
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='comment')
+        for url in self.urls[1:3]:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+        Post.objects.create(text='second', author=self.user)
+        response = self.client.get(self.urls[0],
+                                   HTTP_IF_NONE_MATCH=etags[self.urls[0]])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_missing_post(self):
+        for url in ('/api/v1/posts/0/', '/api/v1/posts/0/comments/'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -1,70 +1,171 @@
 from django.shortcuts import get_object_or_404
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import F
 
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
-from rest_framework.pagination import LimitOffsetPagination
 
-from posts.models import Group, Post
-from likes.models import PostLike
+from posts.cache import COUNTERS_SCOPE, POPULAR_SCOPE, get_versions
+from posts.models import Comment, Group, Post
+from search.backends import get_backend
 
 from .serializers import (GroupSerializer,
                           PostSerializer,
                           CommentSerializer,
                           FollowSerializer,
                           LikeSerializer)
+from .pagination import (PostCursorPagination,
+                         CommentCursorPagination,
+                         LikeCursorPagination,
+                         PopularCursorPagination,
+                         SearchPagination)
 from .permissions import IsOwnerOrReadOnly
-from .mixins import CreateListRetrieveViewSet
+from .mixins import (BulkCreateMixin, ConditionalGetMixin,
+                     CreateListRetrieveViewSet)
 
 
-class FollowViewSet(CreateListRetrieveViewSet):
+class FollowViewSet(BulkCreateMixin, CreateListRetrieveViewSet):
     permission_classes = [IsOwnerOrReadOnly, IsAuthenticated]
     serializer_class = FollowSerializer
     filter_backends = (filters.SearchFilter,)
     search_fields = ('user__username', 'author__username')
 
     def get_queryset(self):
-        return self.request.user.follower.all()
+        return self.request.user.follower.select_related('user', 'author')
 
     def perform_create(self, serializer):
         user = self.request.user
         serializer.save(user=user)
 
+    def get_bulk_save_kwargs(self):
+        return {'user': self.request.user}
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+    def get_bulk_unique_key(self, validated_data):
+        return validated_data['author'].id
+
+
+def post_version(post_id):
+    """
+    Версия поста одним запросом по первичному ключу.
+    """
+    try:
+        return (Post.objects.filter(pk=post_id)
+                .values_list('version', flat=True).first())
+    except ValueError:
+        return None
+
+
+class GroupViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
 
+    def get_etag_parts(self):
+        # Изменение групп сбрасывает версию ленты.
+        return [get_versions('index')['index']]
+
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, BulkCreateMixin,
+                  viewsets.ModelViewSet):
     permission_classes = [IsOwnerOrReadOnly, IsAuthenticatedOrReadOnly]
     queryset = Post.objects.all()
     serializer_class = PostSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = PostCursorPagination
+
+    @property
+    def search_query(self):
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('search', '').strip()
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.action == 'popular':
+                self._paginator = PopularCursorPagination()
+            elif self.search_query:
+                self._paginator = SearchPagination()
+        return super().paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset.select_related('author')
+        if self.action == 'popular':
+            return PostSerializer.optimize_queryset(
+                queryset.filter(hot_score__gt=0), self.request, self.action,
+                ordering=('hot_score', 'id'))
+        queryset = PostSerializer.optimize_queryset(queryset, self.request,
+                                                    self.action)
+        if self.search_query:
+            # Найденные посты упорядочены по релевантности.
+            return get_backend().search_posts(queryset, self.search_query)
+        return queryset
+
+    def get_etag_parts(self):
+        if self.action == 'retrieve':
+            version = post_version(self.kwargs['pk'])
+            return None if version is None else [version]
+        scopes = ['index', COUNTERS_SCOPE]
+        if self.action == 'popular':
+            scopes.append(POPULAR_SCOPE)
+        versions = get_versions(*scopes)
+        return [versions[scope] for scope in scopes]
+
+    @action(detail=False)
+    def popular(self, request, *args, **kwargs):
+        """
+        Популярные посты по оценке активности.
+        """
+        return self.list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def get_bulk_save_kwargs(self):
+        return {'author': self.request.user}
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, BulkCreateMixin,
+                     viewsets.ModelViewSet):
     permission_classes = [IsOwnerOrReadOnly, IsAuthenticatedOrReadOnly]
     serializer_class = CommentSerializer
+    pagination_class = CommentCursorPagination
 
     def get_queryset(self):
-        post = get_object_or_404(Post, id=self.kwargs.get("post_id"))
-        return post.comments.all()
+        post_id = self.kwargs.get('post_id')
+        # Запрос версии для ETag уже проверил, что пост существует.
+        if getattr(self, 'post_version', None) is None:
+            get_object_or_404(Post, id=post_id)
+        return Comment.objects.filter(post_id=post_id).select_related('author')
+
+    def get_etag_parts(self):
+        # Любое изменение комментариев увеличивает версию поста.
+        self.post_version = post_version(self.kwargs.get('post_id'))
+        if self.post_version is None:
+            return None
+        return [self.post_version]
 
     def perform_create(self, serializer):
         post = get_object_or_404(Post, id=self.kwargs.get('post_id'))
-        serializer.save(author=self.request.user, post=post)
+        with transaction.atomic():
+            serializer.save(author=self.request.user, post=post)
+
+    def get_bulk_save_kwargs(self):
+        post = get_object_or_404(Post, id=self.kwargs.get('post_id'))
+        return {'author': self.request.user, 'post': post}
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
 
 
 class LikeViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = (PostLike.objects
-                .values('post_id')
-                .annotate(count_likes=Count('is_like'))
-                .order_by()
+    queryset = (Post.objects
+                .filter(likes_count__gt=0)
+                .annotate(post_id=F('id'), count_likes=F('likes_count'))
+                .values('post_id', 'count_likes')
                 )
     serializer_class = LikeSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = LikeCursorPagination
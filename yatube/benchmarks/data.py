@@ -0,0 +1,385 @@
+"""
+Генератор данных для замеров: пользователи, группы, подписки, посты
+(часть с изображениями), комментарии и лайки.
+
+Посты генерируются пачками по chunk_size: пачка — это посты вместе
+с их комментариями и лайками, поэтому счётчики постов известны сразу
+и сигналы не нужны. У каждой пачки свой поток случайных чисел от seed
+и её начала, так что пачки можно считать в отдельных процессах
+(processes), а данные зависят только от seed, масштаба, chunk_size
+и момента now, к которому отсчитываются даты (по умолчанию текущего).
+Процессы создают объекты и приводят значения полей к виду базы, как
+это делает bulk_create, а родительский процесс только выполняет
+INSERT пачками по batch_size: SQLite пишет в один поток, и сборка
+объектов в нём заняла бы большую часть времени. Ключи задаются явно,
+поэтому после вставки последовательности ключей (PostgreSQL)
+переводятся за них.
+Поисковый индекс и оценки популярности после вставки строятся
+командами rebuild_search_index и update_hot_scores, ленты подписок —
+одним INSERT … SELECT, как их заполнила бы команда rebuild_timelines.
+
+Популярность неравномерна: у авторов с меньшими номерами больше
+подписчиков и постов, новые посты получают больше комментариев
+и лайков.
+"""
+import io
+import random
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import (DEFAULT_DB_ALIAS, connection, connections,
+                       transaction)
+from django.db.models import Max
+from django.utils import timezone
+
+from likes.models import PostLike
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                          make_excerpt)
+
+PASSWORD = 'bench-password'
+IMAGES = 16
+WORDS = (
+    'город', 'река', 'утро', 'вечер', 'книга', 'дорога', 'письмо', 'лето',
+    'зима', 'музыка', 'кошка', 'собака', 'море', 'поезд', 'работа', 'друг',
+    'история', 'программирование', 'фотография', 'путешествие', 'погода',
+    'новость', 'праздник', 'семья', 'школа', 'театр', 'кино', 'сад', 'лес',
+    'небо', 'дождь', 'снег', 'солнце', 'ветер', 'окно', 'дом', 'улица',
+    'красивый', 'новый', 'старый', 'быстрый', 'тихий', 'важный', 'долгий',
+    'читать', 'писать', 'гулять', 'смотреть', 'думать', 'помнить', 'ждать',
+    'сегодня', 'вчера', 'завтра', 'снова', 'очень', 'почти', 'всегда',
+)
+
+
+def skewed(rng, count, power=2):
+    """
+    Номер от 0 до count - 1; меньшие номера выпадают чаще.
+    """
+    return int(count * rng.random() ** power)
+
+
+def text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def chunks(objects, size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prepare(model, objects):
+    """
+    Столбцы и строки для INSERT: значения полей объектов приведены
+    к виду базы так же, как их приводит bulk_create. Ключ пишется,
+    только если он задан.
+    """
+    fields = [field for field in model._meta.local_concrete_fields
+              if not field.primary_key
+              or objects and objects[0].pk is not None]
+    # Само соединение, а не прокси django.db.connection: значения
+    # приводятся миллионы раз.
+    db = connections[DEFAULT_DB_ALIAS]
+    return (
+        [field.column for field in fields],
+        [tuple(field.get_db_prep_save(getattr(obj, field.attname), db)
+               for field in fields)
+         for obj in objects],
+    )
+
+
+def make_image(seed, index):
+    """
+    Синтетическое изображение поста: градиент между двумя цветами.
+    """
+    from PIL import Image
+
+    name = f'posts/seed/{seed}-{index}.jpg'
+    if default_storage.exists(name):
+        return name
+    rng = random.Random(f'{seed}:images:{index}')
+    start = [rng.randrange(256) for _ in range(3)]
+    end = [rng.randrange(256) for _ in range(3)]
+    row = Image.new('RGB', (640, 1))
+    row.putdata([
+        tuple(a + (b - a) * x // 639 for a, b in zip(start, end))
+        for x in range(640)
+    ])
+    image = row.resize((640, 480))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=80)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+class Generator:
+    def __init__(self, users=1000, groups=50, posts=10000, comments=30000,
+                 likes=100000, follows=20, image_ratio=0.1, images=IMAGES,
+                 days=365, now=None, seed=1, prefix='bench',
+                 batch_size=5000, chunk_size=10000, processes=1, log=print,
+                 stdout=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        # Самым новым постам достаётся до 3 * likes / posts лайков,
+        # больше, чем пользователей, их быть не может.
+        self.likes = min(likes, users * posts // 3)
+        self.follows = min(follows, users - 1)
+        self.image_ratio = image_ratio
+        self.images = images if image_ratio else 0
+        self.seed = seed
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.processes = processes
+        self.log = log
+        # Вывод команд, которые строят индекс и оценки после вставки.
+        self.stdout = stdout
+        self.now = (now or timezone.now()).replace(microsecond=0)
+        self.start = self.now - timedelta(days=days)
+
+    def __getstate__(self):
+        # В процессы передаются только параметры генерации.
+        state = self.__dict__.copy()
+        del state['log']
+        del state['stdout']
+        return state
+
+    def rng(self, name):
+        return random.Random(f'{self.seed}:{name}')
+
+    def first_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def pub_date(self, index):
+        """
+        Посты равномерно распределены по периоду, новые — в конце.
+        """
+        span = self.now - self.start
+        return self.start + span * (index + 1) / self.posts
+
+    def later(self, rng, date):
+        """
+        Дата после date; чаще — вскоре после неё.
+        """
+        return date + (self.now - date) * rng.random() ** 4
+
+    def share(self, total, start, end):
+        """
+        Сколько из total приходится на посты с start по end - 1:
+        доля первых x постов равна x ** 3, поэтому новым достаётся
+        больше. Доли пачек в сумме дают ровно total.
+        """
+        return (int(total * (end / self.posts) ** 3)
+                - int(total * (start / self.posts) ** 3))
+
+    def newer(self, rng, start, end):
+        """
+        Пост из пачки с тем же распределением, что и в share.
+        """
+        low = (start / self.posts) ** 3
+        high = (end / self.posts) ** 3
+        post = int((low + (high - low) * rng.random()) ** (1 / 3)
+                   * self.posts)
+        return min(max(post, start), end - 1)
+
+    def map(self, func, items):
+        """
+        Результаты func по порядку items. При processes > 1 их считают
+        дочерние процессы; заданий в очереди не больше 2 * processes,
+        чтобы ещё не записанные данные не копились в памяти.
+        """
+        if self.processes == 1:
+            yield from map(func, items)
+            return
+        if not connection.in_atomic_block:
+            # Соединения родителя не должны переходить в процессы.
+            connections.close_all()
+        with ProcessPoolExecutor(self.processes,
+                                 initializer=django.setup) as pool:
+            pending = deque()
+            for item in items:
+                pending.append(pool.submit(func, item))
+                if len(pending) >= 2 * self.processes:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def insert(self, model, objects):
+        created = 0
+        for batch in chunks(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            created += len(batch)
+        return created
+
+    def write(self, model, prepared):
+        """
+        Записывает строки из prepare тем же INSERT, что и bulk_create.
+        """
+        columns, rows = prepared
+        qn = connection.ops.quote_name
+        sql = (f'INSERT INTO {qn(model._meta.db_table)} '
+               f'({", ".join(map(qn, columns))}) '
+               f'VALUES ({", ".join(["%s"] * len(columns))})')
+        with connection.cursor() as cursor:
+            for batch in chunks(rows, self.batch_size):
+                cursor.executemany(sql, batch)
+        return len(rows)
+
+    def run(self, timelines=True, search=True, scores=True):
+        if User.objects.filter(username=f'{self.prefix}0').exists():
+            raise ValueError(f'Данные с префиксом {self.prefix} уже есть.')
+        self.user_id = self.first_id(User)
+        self.group_id = self.first_id(Group)
+        self.post_id = self.first_id(Post)
+        password = make_password(PASSWORD)
+        created = self.insert(User, (
+            User(pk=self.user_id + index, username=f'{self.prefix}{index}',
+                 first_name=f'Автор {index}', password=password,
+                 date_joined=self.start)
+            for index in range(self.users)
+        ))
+        self.log(f'User: {created}')
+        rng = self.rng('groups')
+        created = self.insert(Group, (
+            Group(pk=self.group_id + index, title=f'Группа {index}',
+                  slug=f'{self.prefix}-group-{index}',
+                  description=text(rng, 5, 20))
+            for index in range(self.groups)
+        ))
+        self.log(f'Group: {created}')
+        self.image_names = list(self.map(partial(make_image, self.seed),
+                                         range(self.images)))
+        created = 0
+        for follows in self.map(self.follow_chunk,
+                                range(0, self.users, self.chunk_size)):
+            with transaction.atomic():
+                created += self.write(Follow, follows)
+        self.log(f'Follow: {created}')
+        created = Counter()
+        for posts, comments, likes in self.map(
+                self.post_chunk, range(0, self.posts, self.chunk_size)):
+            with transaction.atomic():
+                created[Post] += self.write(Post, posts)
+                created[Comment] += self.write(Comment, comments)
+                created[PostLike] += self.write(PostLike, likes)
+            self.log(f'Post: {created[Post]}/{self.posts}')
+        self.log(f'Comment: {created[Comment]}')
+        self.log(f'PostLike: {created[PostLike]}')
+        self.reset_sequences()
+        if timelines:
+            self.fill_timelines(self.user_id)
+        if search:
+            call_command('rebuild_search_index', stdout=self.stdout)
+        if scores:
+            call_command('update_hot_scores', stdout=self.stdout)
+        # Закэшированные страницы не знают о вставленных данных.
+        cache.clear()
+
+    def reset_sequences(self):
+        """
+        Новые объекты получают ключи после вставленных с явными ключами.
+        """
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def follow_chunk(self, start):
+        """
+        Подписки пользователей с start по start + chunk_size - 1.
+        """
+        rng = self.rng(f'follows:{start}')
+        follows = []
+        for user in range(start, min(start + self.chunk_size, self.users)):
+            authors = set()
+            while len(authors) < self.follows:
+                author = skewed(rng, self.users)
+                if author != user:
+                    authors.add(author)
+            follows += [Follow(user_id=self.user_id + user,
+                               author_id=self.user_id + author)
+                        for author in sorted(authors)]
+        return prepare(Follow, follows)
+
+    def post_chunk(self, start):
+        """
+        Посты с start по start + chunk_size - 1, их комментарии
+        и лайки.
+        """
+        end = min(start + self.chunk_size, self.posts)
+        rng = self.rng(f'posts:{start}')
+        comments = []
+        for _ in range(self.share(self.comments, start, end)):
+            post = self.newer(rng, start, end)
+            comments.append(Comment(
+                post_id=self.post_id + post,
+                author_id=self.user_id + rng.randrange(self.users),
+                text=text(rng, 3, 30),
+                created=self.later(rng, self.pub_date(post))))
+        liked = set()
+        count = min(self.share(self.likes, start, end),
+                    (end - start) * self.users)
+        while len(liked) < count:
+            liked.add((self.newer(rng, start, end),
+                       rng.randrange(self.users)))
+        likes = [
+            PostLike(post_id=self.post_id + post,
+                     user_id=self.user_id + user, is_like=True,
+                     like_date=self.later(rng, self.pub_date(post)))
+            for post, user in sorted(liked)
+        ]
+        likes_count = Counter(post for post, _ in liked)
+        comments_count = Counter(comment.post_id for comment in comments)
+        posts = []
+        for index in range(start, end):
+            body = text(rng, 20, 120)
+            posts.append(Post(
+                pk=self.post_id + index,
+                title=text(rng, 2, 6).capitalize(),
+                text=body,
+                excerpt=make_excerpt(body),
+                pub_date=self.pub_date(index),
+                author_id=self.user_id + skewed(rng, self.users),
+                group_id=(self.group_id + skewed(rng, self.groups)
+                          if self.groups and rng.random() < 0.7 else None),
+                image=(self.image_names[rng.randrange(self.images)]
+                       if self.images and rng.random() < self.image_ratio
+                       else ''),
+                likes_count=likes_count[index],
+                comments_count=comments_count[self.post_id + index],
+            ))
+        return (prepare(Post, posts), prepare(Comment, comments),
+                prepare(PostLike, likes))
+
+    def fill_timelines(self, user_id):
+        """
+        Ленты сгенерированных пользователей: все посты их авторов.
+        """
+        timeline = TimelineEntry._meta.db_table
+        follow = Follow._meta.db_table
+        post = Post._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {timeline} (user_id, post_id, author_id, '
+                f'pub_date) SELECT f.user_id, p.id, p.author_id, p.pub_date '
+                f'FROM {follow} f JOIN {post} p ON p.author_id = f.author_id '
+                f'WHERE f.user_id >= %s',
+                [user_id]
+            )
+            self.log(f'{TimelineEntry.__name__}: '
+                     f'{cursor.rowcount}')
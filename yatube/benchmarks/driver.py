@@ -0,0 +1,320 @@
+"""
+Замеры страниц и API на текущей базе.
+
+Запросы выполняются в процессе через тестовый клиент Django, поэтому
+в замер входят middleware, представления, шаблоны, кэш и база, но не
+веб-сервер. Для каждого сценария считаются задержки (p50, p90, p99),
+пропускная способность, ошибки и среднее число запросов к базе.
+Цели запросов (посты, группы, авторы) выбираются из базы генератором
+случайных чисел с заданным seed, так что прогоны повторяемы.
+Списки запрашиваются с первой страницы, следующие страницы берутся
+по ссылке «Следующая» (next в API) из ответа, как их открывает
+читатель: так в режиме курсоров замеряется путь ?cursor=, а не
+постраничный пагинатор.
+"""
+import platform
+import random
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+import django
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from likes.models import PostLike
+from posts.models import Comment, Follow, Group, Post, User
+from .data import WORDS
+
+SAMPLE_SIZE = 1000
+NEXT_LINK = re.compile(r'href="([^"]*)">\s*Следующая')
+
+
+class Targets:
+    """
+    Объекты, к которым обращаются сценарии.
+    """
+    def __init__(self, seed):
+        rng = random.Random(f'{seed}:targets')
+        last = Post.objects.order_by('-pk').values_list('pk', flat=True)
+        last = last.first() or 0
+        candidates = {rng.randint(1, last) for _ in range(SAMPLE_SIZE)}
+        rows = list(Post.objects
+                    .filter(pk__in=candidates)
+                    .values_list('pk', 'author__username')
+                    .order_by('pk'))
+        if not rows:
+            raise ValueError('В базе нет постов.')
+        self.post_ids = [pk for pk, _ in rows]
+        self.usernames = sorted({username for _, username in rows})
+        self.group_slugs = list(Group.objects.order_by('pk')
+                                .values_list('slug', flat=True)
+                                [:SAMPLE_SIZE])
+        reader_id = (Follow.objects.order_by('user_id')
+                     .values_list('user_id', flat=True).first())
+        self.reader = User.objects.get(
+            pk=reader_id or User.objects.order_by('pk')
+            .values_list('pk', flat=True).first())
+
+    def post(self, rng):
+        return rng.choice(self.post_ids)
+
+    def username(self, rng):
+        return rng.choice(self.usernames)
+
+    def group(self, rng):
+        return rng.choice(self.group_slugs) if self.group_slugs else None
+
+    def pages(self, rng):
+        """
+        Сколько страниц списка подряд открывает читатель.
+        """
+        return rng.choice((1, 1, 1, 2, 3))
+
+
+def html_next_page(path, response):
+    match = NEXT_LINK.search(response.content.decode())
+    if match is None:
+        return None
+    return path.split('?', 1)[0] + match[1].replace('&amp;', '&')
+
+
+def api_next_page(path, response):
+    next_url = response.json().get('next')
+    if next_url is None:
+        return None
+    parts = urlsplit(next_url)
+    return f'{parts.path}?{parts.query}'
+
+
+def page_url(name, **kwargs):
+    def url(targets, rng):
+        built = {key: getter(targets, rng) for key, getter in kwargs.items()}
+        return reverse(name, kwargs=built)
+    url.next_page = html_next_page
+    return url
+
+
+def api_page_url(path):
+    def url(targets, rng):
+        return path
+    url.next_page = api_next_page
+    return url
+
+
+def fixed(url):
+    return lambda targets, rng: url
+
+
+def post_url(name, suffix=''):
+    def url(targets, rng):
+        return reverse(name, args=[targets.post(rng)]) + suffix
+    return url
+
+
+# Сценарий: (имя, метод, адрес(targets, rng), авторизация, данные POST).
+# Авторизация: None — аноним, 'session' — вход по сессии, 'jwt' — токен.
+# У адресов списков есть next_page(path, response): адрес следующей
+# страницы из ответа или None.
+SCENARIOS = (
+    ('index', 'get', page_url('posts:index'), None, None),
+    ('index_auth', 'get', page_url('posts:index'), 'session', None),
+    ('popular', 'get', page_url('posts:popular'), None, None),
+    ('group_posts', 'get',
+     page_url('posts:group_list', slug=Targets.group), None, None),
+    ('profile', 'get',
+     page_url('posts:profile', username=Targets.username), None, None),
+    ('post_detail', 'get', post_url('posts:post_detail'), None, None),
+    ('post_detail_auth', 'get', post_url('posts:post_detail'), 'session',
+     None),
+    ('follow_index', 'get', page_url('posts:follow_index'), 'session', None),
+    ('search', 'get',
+     lambda targets, rng: f'/search/?q={rng.choice(WORDS)}', None, None),
+    ('like_toggle', 'post', fixed('/likes/likes/toggle/'), 'session',
+     lambda targets, rng: {'post_id': targets.post(rng)}),
+    ('like_add', 'post', fixed('/likes/likes/add/'), 'session',
+     lambda targets, rng: {'post_id': targets.post(rng)}),
+    ('api_posts', 'get', api_page_url('/api/v1/posts/'), None, None),
+    ('api_post', 'get',
+     lambda targets, rng: f'/api/v1/posts/{targets.post(rng)}/', None, None),
+    ('api_posts_popular', 'get', fixed('/api/v1/posts/popular/'), None,
+     None),
+    ('api_posts_search', 'get',
+     lambda targets, rng: f'/api/v1/posts/?search={rng.choice(WORDS)}',
+     None, None),
+    ('api_comments', 'get',
+     lambda targets, rng: f'/api/v1/posts/{targets.post(rng)}/comments/',
+     None, None),
+    ('api_groups', 'get', fixed('/api/v1/groups/'), None, None),
+    ('api_follow', 'get', fixed('/api/v1/follow/'), 'jwt', None),
+    ('api_likes', 'get', fixed('/api/v1/likes/'), None, None),
+)
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def make_client(auth, user):
+    if auth == 'jwt':
+        token = AccessToken.for_user(user)
+        return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+    client = Client()
+    if auth == 'session':
+        client.force_login(user)
+    return client
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_scenario(scenario, targets, requests, warmup, concurrency, seed):
+    name, method, url, auth, data = scenario
+    timings = []
+    queries = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(index, count, record=True):
+        rng = random.Random(f'{seed}:{name}:{index}:{record}')
+        client = make_client(auth, targets.reader)
+        counter = QueryCounter()
+        headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+        next_page = getattr(url, 'next_page', None)
+        next_path = None
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(counter))
+            for _ in range(count):
+                if next_path is None:
+                    path = url(targets, rng)
+                    pages = targets.pages(rng)
+                else:
+                    path = next_path
+                payload = data(targets, rng) if data else None
+                counter.count = 0
+                start = time.perf_counter()
+                response = getattr(client, method)(path, payload, **headers)
+                duration = time.perf_counter() - start
+                pages -= 1
+                next_path = None
+                if (next_page is not None and pages > 0
+                        and response.status_code == 200):
+                    next_path = next_page(path, response)
+                if not record:
+                    continue
+                with lock:
+                    timings.append(duration)
+                    queries.append(counter.count)
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+
+    def thread_worker(index):
+        try:
+            worker(index, requests // concurrency
+                   + (index < requests % concurrency))
+        finally:
+            # У каждого потока своё соединение с базой.
+            connection.close()
+
+    worker(0, warmup, record=False)
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker(0, requests)
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(thread_worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': len(timings),
+        'errors': len(errors),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p90_ms': round(percentile(timings, 90) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'max_ms': round(max(timings) * 1000, 3),
+        'rps': round(len(timings) / elapsed, 1),
+        'queries': round(sum(queries) / len(queries), 2),
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=None, requests=200, warmup=20, concurrency=1, seed=1,
+        log=print):
+    """
+    Выполняет сценарии и возвращает результат для JSON.
+    """
+    scenarios = [scenario for scenario in SCENARIOS
+                 if names is None or scenario[0] in names]
+    results = {}
+    # Панель отладки и DEBUG искажают замеры.
+    with override_settings(DEBUG=False, INTERNAL_IPS=[]):
+        targets = Targets(seed)
+        for scenario in scenarios:
+            results[scenario[0]] = run_scenario(
+                scenario, targets, requests, warmup, concurrency, seed)
+            log(f'{scenario[0]}: {results[scenario[0]]}')
+    return {
+        'meta': {
+            'commit': commit(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'data': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'likes': PostLike.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'requests': requests,
+            'warmup': warmup,
+            'concurrency': concurrency,
+            'seed': seed,
+        },
+        'scenarios': results,
+    }
+
+
+def compare(base, head, threshold=10):
+    """
+    Строки сравнения двух прогонов: (сценарий, поле, было, стало,
+    изменение в процентах, хуже ли порога). Сравниваются p50, p99,
+    пропускная способность и число запросов к базе.
+    """
+    rows = []
+    for name, result in head['scenarios'].items():
+        before = base['scenarios'].get(name)
+        if before is None:
+            continue
+        for field, higher_is_worse in (('p50_ms', True), ('p99_ms', True),
+                                       ('rps', False), ('queries', True)):
+            old, new = before[field], result[field]
+            change = (new - old) / old * 100 if old else 0
+            worse = change if higher_is_worse else -change
+            rows.append((name, field, old, new, round(change, 1),
+                         worse > threshold))
+    return rows
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.driver import compare
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает два прогона bench_run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('base')
+        parser.add_argument('head')
+        parser.add_argument('--threshold', type=float, default=10,
+                            help='Ухудшение в процентах, считающееся '
+                                 'регрессией')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        runs = []
+        for path in (options['base'], options['head']):
+            with open(path, encoding='utf-8') as file:
+                runs.append(json.load(file))
+        base, head = runs
+        self.stdout.write(f'{base["meta"]["commit"]} → '
+                          f'{head["meta"]["commit"]}')
+        regressions = 0
+        for name, field, old, new, change, worse in compare(
+                base, head, options['threshold']):
+            regressions += worse
+            self.stdout.write(f'{"!" if worse else " "} {name:<20} '
+                              f'{field:<8} {old:>10} {new:>10} '
+                              f'{change:+.1f}%')
+        self.stdout.write(f'Регрессий: {regressions}')
+        if regressions and options['fail_on_regression']:
+            raise CommandError('Есть регрессии.')
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import driver
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержки, пропускную способность и число запросов '
+            'к базе страниц и API; результат — JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*',
+                            help='Сценарии (по умолчанию все)')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Файл для JSON')
+        parser.add_argument('--list', action='store_true',
+                            help='Показать сценарии')
+
+    def handle(self, *args, **options):
+        names = [scenario[0] for scenario in driver.SCENARIOS]
+        if options['list']:
+            self.stdout.write('\n'.join(names))
+            return
+        unknown = set(options['scenarios']) - set(names)
+        if unknown:
+            raise CommandError(f'Нет сценариев: {", ".join(sorted(unknown))}')
+        try:
+            result = driver.run(
+                names=options['scenarios'] or None,
+                requests=options['requests'],
+                warmup=options['warmup'],
+                concurrency=options['concurrency'],
+                seed=options['seed'],
+                log=self.stderr.write,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
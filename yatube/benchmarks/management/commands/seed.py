@@ -0,0 +1,83 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from benchmarks.data import Generator
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу данными для замеров: пользователи, группы, '
+            'подписки, посты с изображениями, комментарии и лайки. '
+            'Данные считаются в нескольких процессах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--likes', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Подписок у пользователя')
+        parser.add_argument('--image-ratio', type=float, default=0.1,
+                            help='Доля постов с изображением')
+        parser.add_argument('--images', type=int, default=16,
+                            help='Сколько разных изображений создать '
+                                 'в MEDIA_ROOT/posts/seed/')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить посты')
+        parser.add_argument('--now',
+                            help='Конец периода в формате ISO 8601, '
+                                 'по умолчанию текущее время; от него '
+                                 'зависят даты')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default='bench',
+                            help='Начало имён пользователей')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Объектов в одном bulk_create')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Постов в одном задании процесса; '
+                                 'от него зависят данные')
+        parser.add_argument('--processes', type=int,
+                            default=os.cpu_count() or 1)
+        parser.add_argument('--skip-search', action='store_true',
+                            help='Не строить поисковый индекс')
+        parser.add_argument('--skip-timelines', action='store_true',
+                            help='Не заполнять ленты подписок')
+
+    def handle(self, *args, **options):
+        now = None
+        if options['now']:
+            try:
+                now = parse_datetime(options['now'])
+            except ValueError:
+                now = None
+            if now is None:
+                raise CommandError(f'Неверная дата: {options["now"]}')
+            if timezone.is_naive(now):
+                now = timezone.make_aware(now)
+        generator = Generator(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            likes=options['likes'],
+            follows=options['follows'],
+            image_ratio=options['image_ratio'],
+            images=options['images'],
+            days=options['days'],
+            now=now,
+            seed=options['seed'],
+            prefix=options['prefix'],
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+            processes=options['processes'],
+            log=self.stdout.write,
+            stdout=self.stdout,
+        )
+        try:
+            generator.run(timelines=not options['skip_timelines'],
+                          search=not options['skip_search'])
+        except ValueError as error:
+            raise CommandError(error)
@@ -0,0 +1,113 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from likes.models import PostLike
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+from .data import Generator
+from .driver import SCENARIOS, compare, run
+
+
+def generate(**kwargs):
+    options = dict(users=6, groups=2, posts=30, comments=40, likes=50,
+                   follows=2, image_ratio=0, log=lambda message: None,
+                   stdout=StringIO())
+    options.update(kwargs)
+    Generator(**options).run()
+
+
+class GeneratorTest(TestCase):
+    def test_counts(self):
+        """
+        Создаются объекты заданного масштаба, счётчики постов
+        совпадают с лайками и комментариями, ленты заполнены.
+        """
+        generate()
+        self.assertEqual(User.objects.count(), 6)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertEqual(PostLike.objects.count(), 50)
+        self.assertEqual(Follow.objects.count(), 12)
+        drifted = (Post.objects
+                   .annotate(real_likes=Count('postlike', distinct=True),
+                             real_comments=Count('comments', distinct=True))
+                   .values_list('likes_count', 'real_likes',
+                                'comments_count', 'real_comments'))
+        for likes_count, likes, comments_count, comments in drifted:
+            self.assertEqual(likes_count, likes)
+            self.assertEqual(comments_count, comments)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(User.objects.get(username='bench0')
+                        .check_password('bench-password'))
+
+    def test_deterministic(self):
+        """
+        Один seed и момент now дают одинаковые данные при любом числе
+        процессов.
+        """
+        def snapshot(prefix):
+            return [
+                (text, author.replace(prefix, ''), likes, comments, date)
+                for text, author, likes, comments, date in Post.objects
+                .filter(author__username__startswith=prefix)
+                .order_by('pk').values_list('text', 'author__username',
+                                            'likes_count', 'comments_count',
+                                            'pub_date')
+            ]
+
+        now = timezone.now() - timedelta(days=3)
+        generate(prefix='first', chunk_size=8, now=now)
+        generate(prefix='second', chunk_size=8, processes=2, now=now)
+        self.assertEqual(snapshot('first'), snapshot('second'))
+        self.assertEqual(snapshot('first')[-1][-1],
+                         now.replace(microsecond=0))
+        # Ключи новых объектов продолжают вставленные.
+        post = Post.objects.create(text='new', author=User.objects.first())
+        self.assertGreater(post.pk, max(Post.objects.exclude(pk=post.pk)
+                                        .values_list('pk', flat=True)))
+
+    def test_existing_prefix(self):
+        generate()
+        with self.assertRaises(ValueError):
+            generate()
+
+
+class DriverTest(TestCase):
+    def test_run_and_compare(self):
+        generate()
+        names = ['index', 'follow_index', 'like_toggle', 'api_follow']
+        result = run(names=names, requests=3, warmup=1,
+                     log=lambda message: None)
+        self.assertEqual(list(result['scenarios']), names)
+        for scenario in result['scenarios'].values():
+            self.assertEqual(scenario['requests'], 3)
+            self.assertEqual(scenario['errors'], 0)
+        self.assertEqual(result['meta']['data']['posts'], 30)
+        slower = {'scenarios': {
+            name: {**scenario, 'p50_ms': scenario['p50_ms'] * 2}
+            for name, scenario in result['scenarios'].items()
+        }}
+        rows = compare(result, slower)
+        self.assertTrue(all(worse for _, field, _, _, _, worse in rows
+                            if field == 'p50_ms'))
+
+    def test_pages_follow_cursor(self):
+        """
+        Следующие страницы списков открываются по курсору из ответа.
+        """
+        generate()
+        for name in ('index', 'api_posts'):
+            with self.subTest(name=name):
+                url = dict((row[0], row[2]) for row in SCENARIOS)[name]
+                path = url(None, None)
+                self.assertNotIn('page=', path)
+                response = self.client.get(path)
+                next_path = url.next_page(path, response)
+                self.assertIn('cursor=', next_path)
+                self.assertNotIn('page=', next_path)
+                next_response = self.client.get(next_path)
+                self.assertEqual(next_response.status_code, 200)
+                self.assertNotEqual(next_response.content, response.content)
@@ -0,0 +1,80 @@
+import os
+import pickle
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import (
+    FileBasedCache as BaseFileBasedCache
+)
+from django.core.files import locks
+
+LOCK_NAME = 'incr.lock'
+
+
+class FileBasedCache(BaseFileBasedCache):
+    """
+    Файловый кэш, общий для процессов одного сервера.
+    В отличие от стандартного, атомарны:
+    - add: файл записи создаётся жёсткой ссылкой, и из нескольких
+      процессов запись создаёт только первый;
+    - incr и decr: чтение и запись идут под блокировкой файла
+      LOCK_NAME в каталоге кэша, срок жизни записи сохраняется.
+    Остальные операции, как и в стандартном кэше, не блокируют:
+    set одновременно с incr того же ключа может потерять одно из
+    изменений.
+    """
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.has_key(key, version):
+            return False
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            os.link(tmp_path, fname)
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+        return True
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        # Файл блокировки не оканчивается на cache_suffix, поэтому
+        # clear и вытеснение его не трогают.
+        with open(os.path.join(self._dir, LOCK_NAME), 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        with self._locked():
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except FileNotFoundError:
+                value = None
+            if value is None or expiry is not None and expiry < time.time():
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+            try:
+                with open(fd, 'wb') as f:
+                    f.write(pickle.dumps(expiry, self.pickle_protocol))
+                    f.write(zlib.compress(
+                        pickle.dumps(value, self.pickle_protocol)))
+                os.replace(tmp_path, fname)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        return value
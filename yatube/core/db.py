@@ -0,0 +1,160 @@
+"""
+Основная база и реплика для чтения.
+
+Реплика (база 'replica' в settings.DATABASES) используется только для
+чтений в GET- и HEAD-запросах к представлениям модулей
+settings.DB_REPLICA_VIEWS. Всё остальное — записи, изменяющие запросы,
+команды и фоновые задачи — работает с основной базой.
+
+Чтобы клиент видел собственные изменения, после успешного изменяющего
+запроса он settings.DB_REPLICA_STICKY_SECONDS секунд читает из основной
+базы: браузер — по cookie, авторизованный пользователь — по метке в
+кэше (она работает и для клиентов API с токеном). Запрос, который
+что-то записал, дочитывает из основной базы.
+
+Соединения SQLite при открытии настраиваются по settings.SQLITE_PRAGMAS.
+"""
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.functional import empty
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'primary_db'
+STICKY_KEY = 'db:sticky:{}'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.replica = True
+        self.user = None
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def has_replica():
+    return REPLICA in connections.databases
+
+
+def check_user(state):
+    """
+    Отключает реплику, если пользователь запроса недавно что-то
+    изменил. Пользователь проверяется заново, когда его подменяет
+    аутентификация DRF.
+    """
+    user = state.request.__dict__.get('user')
+    if user is None or user is state.user:
+        return
+    if getattr(user, '_wrapped', None) is empty:
+        # Ленивый пользователь сессии ещё не загружен.
+        return
+    state.user = user
+    if user.is_authenticated and cache.get(STICKY_KEY.format(user.pk)):
+        state.replica = False
+
+
+def replica_allowed():
+    state = _state.get()
+    if state is None or not state.replica:
+        return False
+    check_user(state)
+    return state.replica
+
+
+def stick_to_primary():
+    """
+    Дальнейшие чтения текущего запроса идут в основную базу.
+    """
+    state = _state.get()
+    if state is not None:
+        state.replica = False
+
+
+def is_lagging(timestamps):
+    """
+    True, если какое-то из изменений (время time.time()) реплика
+    могла ещё не получить.
+    """
+    edge = time.time() - settings.DB_REPLICA_MAX_LAG
+    return any(timestamp > edge for timestamp in timestamps)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if has_replica() and replica_allowed():
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        stick_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Включает реплику для чтений представлений settings.DB_REPLICA_VIEWS
+    и делает клиента «липким» к основной базе после изменений.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not has_replica():
+            return self.get_response(request)
+        token = _state.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = settings.DB_REPLICA_STICKY_SECONDS
+            response.set_cookie(STICKY_COOKIE, '1', max_age=seconds,
+                                httponly=True, samesite='Lax')
+            user = request.__dict__.get('user')
+            if user is not None and user.is_authenticated:
+                cache.set(STICKY_KEY.format(user.pk), True, seconds)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not has_replica():
+            return None
+        if (request.method in SAFE_METHODS
+                and view_func.__module__ in settings.DB_REPLICA_VIEWS
+                and STICKY_COOKIE not in request.COOKIES):
+            _state.set(RoutingState(request))
+        return None
+
+
+def check_connections(**kwargs):
+    """
+    Закрывает постоянные соединения, оборвавшиеся между запросами:
+    иначе запрос получил бы ошибку от закрытого сервером соединения.
+    """
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    for conn in connections.all():
+        if conn.connection is not None and not conn.is_usable():
+            conn.close()
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Настраивает новое соединение SQLite по settings.SQLITE_PRAGMAS.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
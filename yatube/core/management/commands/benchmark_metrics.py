@@ -0,0 +1,68 @@
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+
+def measure(client, url, requests):
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get(url)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время ответа главной страницы с метриками и без'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        client = Client()
+        url = reverse('posts:index')
+        results = {True: [], False: []}
+        # Журналы профилирования и панель отладки отключены, чтобы
+        # измерить только метрики; раунды чередуются, чтобы уравнять
+        # прогрев. Метрики пишутся, как на сервере, но во временный
+        # каталог, чтобы не попасть в /metrics сервера.
+        directory = tempfile.TemporaryDirectory()
+        metrics.serve()
+        try:
+            with override_settings(PROFILING_SAMPLE_RATE=0,
+                                   SLOW_QUERY_MS=None, INTERNAL_IPS=[],
+                                   METRICS_DIR=directory.name):
+                measure(client, url, options['requests'])
+                for _ in range(options['rounds']):
+                    for enabled in (False, True):
+                        with override_settings(METRICS_ENABLED=enabled):
+                            results[enabled] += measure(
+                                client, url, options['requests'])
+                start = time.perf_counter()
+                metrics.flush()
+                metrics.render()
+                elapsed = time.perf_counter() - start
+        finally:
+            metrics.serve(False)
+            directory.cleanup()
+        for enabled, label in ((False, 'без метрик'), (True, 'с метриками')):
+            timings = sorted(results[enabled])
+            self.stdout.write(
+                f'{label}: среднее '
+                f'{statistics.mean(timings) * 1e6:.0f} мкс, '
+                f'p50 {timings[len(timings) // 2] * 1e6:.0f} мкс, '
+                f'p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} мкс'
+            )
+        overhead = (statistics.mean(results[True])
+                    - statistics.mean(results[False]))
+        self.stdout.write(f'Накладные расходы: {overhead * 1e6:.0f} мкс '
+                          f'на запрос')
+        self.stdout.write(f'Запись и сборка /metrics: '
+                          f'{elapsed * 1e3:.1f} мс')
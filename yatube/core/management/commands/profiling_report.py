@@ -0,0 +1,88 @@
+import glob
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SORT_FIELDS = ('ms', 'queries', 'db_ms', 'similar', 'duplicates',
+               'template_ms', 'size')
+
+
+def read_records(path):
+    """
+    Записи журнала и его ротированных копий.
+    """
+    for name in sorted(glob.glob(f'{glob.escape(path)}*')):
+        with open(name, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else 0
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Сводка журнала профилирования: худшие представления'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=SORT_FIELDS, default='db_ms',
+                            help='Поле, по среднему которого сортировать')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--log', default=settings.PROFILING_LOG)
+        parser.add_argument('--slow-log', default=settings.SLOW_QUERY_LOG)
+
+    def handle(self, *args, **options):
+        views = defaultdict(list)
+        for record in read_records(options['log']):
+            views[record['view'] or record['path']].append(record)
+        if not views:
+            self.stdout.write('Журнал профилирования пуст.')
+        rows = sorted(
+            views.items(),
+            key=lambda item: mean(record[options['sort']]
+                                  for record in item[1]),
+            reverse=True,
+        )[:options['limit']]
+        for view, records in rows:
+            self.stdout.write(
+                f'{view}: запросов {len(records)}, '
+                f'мс p50 {percentile([r["ms"] for r in records], 50):.1f} '
+                f'p95 {percentile([r["ms"] for r in records], 95):.1f}, '
+                f'SQL {mean(r["queries"] for r in records):.1f} '
+                f'(макс. {max(r["queries"] for r in records)}) '
+                f'за {mean(r["db_ms"] for r in records):.1f} мс, '
+                f'повторов {mean(r["similar"] for r in records):.1f}, '
+                f'дублей {mean(r["duplicates"] for r in records):.1f}, '
+                f'шаблоны {mean(r["template_ms"] for r in records):.1f} мс, '
+                f'ответ {mean(r["size"] for r in records):.0f} Б'
+            )
+            similar = Counter(r['top_similar'] for r in records
+                              if r['top_similar'])
+            if similar:
+                self.stdout.write(
+                    f'    частый повтор: {similar.most_common(1)[0][0]}')
+        slow = defaultdict(list)
+        for record in read_records(options['slow_log']):
+            slow[record['sql']].append(record)
+        if slow:
+            self.stdout.write('Медленные запросы:')
+        for sql, records in sorted(
+                slow.items(),
+                key=lambda item: sum(r['ms'] for r in item[1]),
+                reverse=True)[:options['limit']]:
+            views = ', '.join(sorted({str(r['view']) for r in records}))
+            self.stdout.write(
+                f'{len(records)} раз, макс. '
+                f'{max(r["ms"] for r in records):.1f} мс ({views}): {sql}'
+            )
@@ -0,0 +1,111 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from likes.utils import toggle_like
+from posts.models import Comment, Post, User
+
+# Настройки SQLite по умолчанию для сравнения с settings.SQLITE_PRAGMAS.
+DEFAULT_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = ('Нагружает SQLite параллельными лайками и комментариями '
+            'и выводит долю ошибок и задержки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--operations', type=int, default=50,
+                            help='Операций на поток')
+        parser.add_argument('--posts', type=int, default=5)
+        parser.add_argument(
+            '--pragmas', choices=('settings', 'default'),
+            default='settings',
+            help='settings — SQLITE_PRAGMAS, default — журнал '
+                 'и синхронизация SQLite по умолчанию'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда нагружает только SQLite.')
+        pragmas = (DEFAULT_PRAGMAS if options['pragmas'] == 'default'
+                   else None)
+        # Лайки пишутся в базу напрямую, без журнала likes.buffer.
+        with override_settings(LIKES_BUFFER_HOT_RATE=None,
+                               **({'SQLITE_PRAGMAS': pragmas}
+                                  if pragmas else {})):
+            connections.close_all()
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+            users = [User.objects.create_user(username=f'stress_{index}')
+                     for index in range(options['threads'])]
+            posts = [Post.objects.create(author=users[0],
+                                         text=f'stress {index}')
+                     for index in range(options['posts'])]
+            try:
+                latencies, errors, elapsed = self.run(
+                    users, posts, options['operations'])
+            finally:
+                User.objects.filter(pk__in=[user.pk for user in users]
+                                    ).delete()
+                connections.close_all()
+        total = len(latencies) + sum(errors.values())
+        self.stdout.write(
+            f'Режим журнала: {journal_mode}\n'
+            f'Операций: {total}, ошибок: {sum(errors.values())} '
+            f'({sum(errors.values()) / total:.1%})\n'
+            f'Операций в секунду: {total / elapsed:.0f}\n'
+            f'Задержка, мс: p50 {percentile(latencies, 50) * 1000:.1f}, '
+            f'p95 {percentile(latencies, 95) * 1000:.1f}, '
+            f'p99 {percentile(latencies, 99) * 1000:.1f}, '
+            f'max {max(latencies, default=0) * 1000:.1f}, '
+            f'среднее {statistics.mean(latencies or [0]) * 1000:.1f}'
+        )
+        for error, count in errors.most_common():
+            self.stdout.write(f'{count} × {error}')
+
+    def run(self, users, posts, operations):
+        latencies = []
+        errors = Counter()
+        lock = threading.Lock()
+
+        def work(user):
+            rng = random.Random(user.pk)
+            try:
+                for index in range(operations):
+                    post = rng.choice(posts)
+                    start = time.perf_counter()
+                    try:
+                        if rng.random() < 0.5:
+                            toggle_like(post.pk, user)
+                        else:
+                            Comment.objects.create(post=post, author=user,
+                                                   text=f'stress {index}')
+                    except OperationalError as error:
+                        with lock:
+                            errors[str(error)] += 1
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(len(users)) as executor:
+            list(executor.map(work, users))
+        return latencies, errors, time.perf_counter() - start
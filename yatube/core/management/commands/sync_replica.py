@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db import REPLICA
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файл реплики '
+            '(для проверки чтения с реплики без PostgreSQL)')
+
+    def handle(self, *args, **options):
+        if REPLICA not in connections.databases:
+            raise CommandError('Реплика не настроена (DB_REPLICA_NAME).')
+        primary, replica = connections['default'], connections[REPLICA]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Копирование поддерживается только для '
+                               'SQLite; реплику PostgreSQL настраивают '
+                               'средствами репликации сервера.')
+        replica.close()
+        primary.ensure_connection()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(f'Реплика обновлена: '
+                          f'{replica.settings_dict["NAME"]}')
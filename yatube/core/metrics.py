@@ -0,0 +1,228 @@
+"""
+Метрики в формате Prometheus, общие для процессов сервера.
+
+Каждый процесс считает счётчики и гистограммы в памяти и не чаще раза
+в settings.METRICS_FLUSH_INTERVAL секунд записывает их в свой файл
+в settings.METRICS_DIR. Файл заменяется атомарно, поэтому /metrics
+читает файлы всех процессов без блокировок и складывает значения.
+Файлы завершившихся процессов остаются: счётчики Prometheus не
+должны уменьшаться после перезапуска рабочего процесса.
+
+Сами по себе пишут файлы только процессы сервера: yatube/wsgi.py
+вызывает serve(). Тесты и команды управления считают метрики в памяти
+и записывают их, только если явно вызовут flush().
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Время ответа по имени URL'),
+    'yatube_db_queries_total': (
+        'counter', 'Запросы к базе по имени URL'),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Время запросов к базе по имени URL'),
+    'yatube_page_cache_requests_total': (
+        'counter', 'Обращения к кэшу страниц: hit, miss, not_modified'),
+    'yatube_thumbnail_generation_seconds': (
+        'histogram', 'Время создания превью'),
+    'yatube_likes_total': (
+        'counter', 'Изменения лайков: like, unlike'),
+    'yatube_comments_total': (
+        'counter', 'Созданные комментарии'),
+}
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_pid = None
+_name = None
+_flushed = 0.0
+_serving = False
+
+
+def labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def reset_after_fork():
+    """
+    Дочерний процесс начинает с пустых метрик и своего файла:
+    иначе он повторил бы значения родителя.
+    """
+    global _pid, _name, _flushed
+    if _pid == os.getpid():
+        return
+    _counters.clear()
+    _histograms.clear()
+    _pid = os.getpid()
+    _name = f'{_pid}-{time.time_ns()}.json'
+    _flushed = time.monotonic()
+
+
+def inc(name, amount=1, **labels):
+    if not settings.METRICS_ENABLED:
+        return
+    key = (name, labels_key(labels))
+    with _lock:
+        reset_after_fork()
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    if not settings.METRICS_ENABLED:
+        return
+    key = (name, labels_key(labels))
+    with _lock:
+        reset_after_fork()
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                histogram[0][index] += 1
+                break
+        histogram[1] += value
+        histogram[2] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def serve(enabled=True):
+    """
+    Включает запись метрик по ходу запросов и при выходе процесса.
+    """
+    global _serving
+    _serving = enabled
+
+
+def maybe_flush():
+    if (_serving and settings.METRICS_ENABLED
+            and time.monotonic() - _flushed
+            >= settings.METRICS_FLUSH_INTERVAL):
+        flush()
+
+
+def flush():
+    """
+    Записывает метрики процесса в его файл.
+    """
+    global _flushed
+    # Снимок и запись идут под одной блокировкой, чтобы более старый
+    # снимок не заменил более новый.
+    with _flush_lock:
+        with _lock:
+            reset_after_fork()
+            _flushed = time.monotonic()
+            data = json.dumps({
+                'counters': [[name, labels, value]
+                             for (name, labels), value
+                             in _counters.items()],
+                'histograms': [[name, labels, *histogram]
+                               for (name, labels), histogram
+                               in _histograms.items()],
+            })
+            path = os.path.join(settings.METRICS_DIR, _name)
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=settings.METRICS_DIR,
+                                        suffix='.tmp')
+        with open(fd, 'w') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+
+def collect():
+    """
+    Сумма метрик всех процессов: ({ключ: значение}, {ключ: гистограмма}).
+    """
+    counters = {}
+    histograms = {}
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, name)) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for metric, labels, value in data['counters']:
+            key = (metric, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for metric, labels, buckets, total, count in data['histograms']:
+            key = (metric, tuple(map(tuple, labels)))
+            summed = histograms.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+            summed[0] = [a + b for a, b in zip(summed[0], buckets)]
+            summed[1] += total
+            summed[2] += count
+    return counters, histograms
+
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in pairs)
+
+
+def render():
+    """
+    Метрики всех процессов в текстовом формате Prometheus.
+    """
+    counters, histograms = collect()
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        if kind == 'counter':
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric:
+                    lines.append(f'{metric}{format_labels(labels)} {value}')
+            continue
+        for (name, labels), (buckets, total, count) in sorted(
+                histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f'{metric}_bucket'
+                             f'{format_labels(labels, le=bound)} '
+                             f'{cumulative}')
+            lines += [
+                f'{metric}_bucket{format_labels(labels, le="+Inf")} {count}',
+                f'{metric}_sum{format_labels(labels)} {total}',
+                f'{metric}_count{format_labels(labels)} {count}',
+            ]
+    return '\n'.join(lines) + '\n'
+
+
+@atexit.register
+def flush_at_exit():
+    if _serving and _pid == os.getpid():
+        try:
+            flush()
+        except OSError:
+            pass
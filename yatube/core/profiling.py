@@ -0,0 +1,176 @@
+"""
+Профилирование запросов в рабочем режиме.
+
+ProfilingMiddleware для доли запросов settings.PROFILING_SAMPLE_RATE
+пишет в журнал 'core.profiling' запись JSON: представление, время
+ответа, число запросов к базе и их время, повторы запросов, время
+отрисовки шаблонов и размер ответа. Повторы считаются двух видов:
+similar — тот же SQL с другими параметрами (признак N+1), duplicates —
+тот же SQL с теми же параметрами.
+
+Запросы к базе дольше settings.SLOW_QUERY_MS пишутся в журнал
+'core.profiling.slow_queries' у всех запросов, а не только у выборки.
+Сводку по журналу выводит команда profiling_report.
+Время ответа и число запросов к базе по представлениям
+middleware также передаёт в core.metrics.
+"""
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler as BaseRotatingFileHandler
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(f'{__name__}.slow_queries')
+
+_profile = ContextVar('request_profile', default=None)
+
+
+class RotatingFileHandler(BaseRotatingFileHandler):
+    """
+    RotatingFileHandler, который создаёт каталог журнала.
+    """
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class RequestProfile:
+    def __init__(self, request, sampled):
+        self.request = request
+        self.sampled = sampled
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+        self.executions = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            if self.sampled:
+                self.statements[sql] += 1
+                self.executions[sql, repr(params)] += 1
+            if (settings.SLOW_QUERY_MS is not None
+                    and duration * 1000 >= settings.SLOW_QUERY_MS):
+                slow_logger.warning(json.dumps({
+                    'time': timezone.now().isoformat(),
+                    'view': view_name(self.request),
+                    'database': context['connection'].alias,
+                    'ms': round(duration * 1000, 1),
+                    'sql': sql,
+                }, ensure_ascii=False))
+
+    def record(self, response, duration):
+        similar = Counter({sql: count - 1
+                           for sql, count in self.statements.items()
+                           if count > 1})
+        top = similar.most_common(1)
+        return {
+            'time': timezone.now().isoformat(),
+            'view': view_name(self.request),
+            'method': self.request.method,
+            'path': self.request.path,
+            'status': response.status_code,
+            'ms': round(duration * 1000, 1),
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 1),
+            'similar': sum(similar.values()),
+            'duplicates': sum(count - 1
+                              for count in self.executions.values()
+                              if count > 1),
+            'top_similar': top[0][0][:300] if top else None,
+            'template_ms': round(self.template_time * 1000, 1),
+            'size': (None if response.streaming
+                     else len(response.content)),
+        }
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        if (not sampled and settings.SLOW_QUERY_MS is None
+                and not settings.METRICS_ENABLED):
+            return self.get_response(request)
+        profile = RequestProfile(request, sampled)
+        token = _profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        duration = time.perf_counter() - start
+        if sampled:
+            logger.info(json.dumps(profile.record(response, duration),
+                                   ensure_ascii=False))
+        if settings.METRICS_ENABLED:
+            view = view_name(request) or 'unresolved'
+            metrics.observe('yatube_http_request_duration_seconds',
+                            duration, view=view, method=request.method,
+                            status=response.status_code)
+            metrics.inc('yatube_db_queries_total', profile.queries,
+                        view=view)
+            metrics.inc('yatube_db_query_seconds_total', profile.db_time,
+                        view=view)
+            metrics.maybe_flush()
+        return response
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _profile.get()
+        if profile is None or not profile.sampled:
+            return super().render(context, request)
+        # Вложенные отрисовки (render_to_string в шаблоне)
+        # уже входят во время внешней.
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - start
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """
+    Шаблоны Django, время отрисовки которых учитывает
+    ProfilingMiddleware.
+    """
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfiledTemplate(template.template, self)
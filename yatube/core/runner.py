@@ -0,0 +1,47 @@
+"""
+Запуск тестов отдельно от данных запущенного сервера.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner, который на время тестов переносит общий кэш
+    во временный каталог: тесты вызывают cache.clear() и не должны
+    стирать кэш сервера или читать его записи. Выборочное
+    профилирование и журнал медленных запросов выключены, чтобы
+    тесты не писали в журналы сервера; тесты профилирования
+    включают их сами. Метрики тоже выключены, а их каталог временный.
+    """
+    def isolated_settings(self, temp_dir):
+        return {
+            'CACHES': {
+                'default': {
+                    **settings.CACHES['default'],
+                    'BACKEND': 'core.cache.FileBasedCache',
+                    'LOCATION': os.path.join(temp_dir, 'cache'),
+                },
+            },
+            'PROFILING_SAMPLE_RATE': 0,
+            'SLOW_QUERY_MS': None,
+            'METRICS_ENABLED': False,
+            'METRICS_DIR': os.path.join(temp_dir, 'metrics'),
+        }
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.temp_dir = tempfile.mkdtemp(prefix='yatube-tests-')
+        self.isolated = override_settings(
+            **self.isolated_settings(self.temp_dir))
+        self.isolated.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.isolated.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,278 @@
+import json
+import os
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, router
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.cache import bump, get_versions
+from posts.models import Post, User
+from . import metrics
+from .db import (REPLICA, STICKY_COOKIE, ReplicaRoutingMiddleware,
+                 stick_to_primary)
+from .profiling import ProfilingMiddleware
+
+
+def posts_view(request):
+    """
+    Отвечает базой, из которой было бы прочитано чтение поста.
+    """
+    get_versions('index')
+    return HttpResponse(router.db_for_read(Post))
+
+
+def write_view(request):
+    stick_to_primary()
+    return HttpResponse(router.db_for_write(Post))
+
+
+posts_view.__module__ = write_view.__module__ = 'posts.views'
+
+
+@override_settings(DB_REPLICA_MAX_LAG=5)
+class ReplicaRoutingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user')
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        replica = {**connections.databases['default']}
+        patcher = mock.patch.dict(connections.databases, {REPLICA: replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_view(self, request, view=posts_view):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(request)
+
+    def test_reads_go_to_replica(self):
+        """
+        GET к представлениям постов читает с реплики,
+        чтения вне запроса — из основной базы.
+        """
+        request = self.factory.get('/')
+        self.assertEqual(self.run_view(request).content.decode(), REPLICA)
+        self.assertEqual(router.db_for_read(Post), 'default')
+        request = self.factory.get('/')
+        view = mock.Mock(return_value=HttpResponse(), __module__='users.views')
+        self.run_view(request, view)
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_sticky_after_write(self):
+        """
+        После POST клиент по cookie читает из основной базы,
+        а авторизованный пользователь — и без cookie.
+        """
+        request = self.factory.post('/')
+        request.user = self.user
+        response = self.run_view(request, write_view)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(self.run_view(request).content.decode(), 'default')
+        request = self.factory.get('/')
+        request.user = self.user
+        self.assertEqual(self.run_view(request).content.decode(), 'default')
+
+    def test_recent_bump_reads_primary(self):
+        """
+        Страница, версия которой только что сброшена, читается
+        из основной базы, чтобы в кэш не попали устаревшие данные.
+        """
+        bump('index')
+        request = self.factory.get('/')
+        self.assertEqual(self.run_view(request).content.decode(), 'default')
+        with override_settings(DB_REPLICA_MAX_LAG=0):
+            request = self.factory.get('/')
+            self.assertEqual(self.run_view(request).content.decode(),
+                             REPLICA)
+
+
+class HealthTest(TestCase):
+    def test_health(self):
+        response = self.client.get('/health/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json(), {'databases': {'default': 'ok'}})
+
+
+class SQLitePragmasTest(TestCase):
+    def test_pragmas_applied(self):
+        """
+        Новое соединение SQLite получает PRAGMA из настроек.
+        """
+        with connection.cursor() as cursor:
+            for name, value in (('synchronous', 1), ('temp_store', 2),
+                                ('busy_timeout', 5000)):
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], value)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1, SLOW_QUERY_MS=None)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user')
+        cls.post = Post.objects.create(text='test_post', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_record(self):
+        """
+        Запись содержит представление, запросы, шаблоны и размер.
+        """
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            response = self.client.get('/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], HTTPStatus.OK)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertEqual(record['size'], len(response.content))
+
+    def test_repeated_queries(self):
+        """
+        Один SQL с разными параметрами — повторы, с одинаковыми — дубли.
+        """
+        def get_response(request):
+            for pk in (self.post.pk, self.post.pk, 0):
+                Post.objects.filter(pk=pk).exists()
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(get_response)
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            middleware(RequestFactory().get('/'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 3)
+        self.assertEqual(record['similar'], 2)
+        self.assertEqual(record['duplicates'], 1)
+        self.assertIn('posts_post', record['top_similar'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0, SLOW_QUERY_MS=0)
+    def test_slow_queries(self):
+        with self.assertLogs('core.profiling.slow_queries') as logs:
+            self.client.get(f'/posts/{self.post.pk}/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:post_detail')
+        self.assertEqual(record['database'], 'default')
+
+    def test_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log = os.path.join(directory, 'profiling.log')
+            with open(log, 'w') as file:
+                for view, queries in (('posts:index', 3),
+                                      ('posts:profile', 40),
+                                      ('posts:profile', 20)):
+                    file.write(json.dumps({
+                        'view': view, 'path': '/', 'ms': 10,
+                        'queries': queries, 'db_ms': queries,
+                        'similar': queries - 2, 'duplicates': 0,
+                        'top_similar': 'SELECT 1', 'template_ms': 1,
+                        'size': 100,
+                    }) + '\n')
+            out = StringIO()
+            call_command('profiling_report', log=log,
+                         slow_log=os.path.join(directory, 'slow.log'),
+                         sort='queries', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('posts:profile: запросов 2'))
+        self.assertIn('SQL 30.0 (макс. 40)', lines[0])
+        self.assertTrue(lines[2].startswith('posts:index'))
+
+
+@override_settings(METRICS_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user')
+        cls.post = Post.objects.create(text='test_post', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(METRICS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def value(self, text, line):
+        for row in text.splitlines():
+            if row.startswith(line + ' '):
+                return float(row.rsplit(' ', 1)[1])
+        return 0
+
+    def test_metrics(self):
+        """
+        /metrics отдаёт время ответа по имени URL, обращения
+        к кэшу страниц и лайки.
+        """
+        before = self.client.get('/metrics').content.decode()
+        self.client.get('/')
+        self.client.get('/')
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('likes:toggle'), {'post_id': self.post.id})
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        text = response.content.decode()
+        for line, delta in (
+            ('yatube_http_request_duration_seconds_count{method="GET",'
+             'status="200",view="posts:index"}', 2),
+            ('yatube_page_cache_requests_total{result="hit"}', 1),
+            ('yatube_page_cache_requests_total{result="miss"}', 1),
+            ('yatube_likes_total{action="like"}', 1),
+        ):
+            self.assertEqual(self.value(text, line)
+                             - self.value(before, line), delta)
+        self.assertIn('yatube_db_queries_total{view="posts:index"}', text)
+
+    def test_processes_are_summed(self):
+        """
+        Значения из файлов других процессов складываются.
+        """
+        metrics.inc('yatube_comments_total')
+        metrics.flush()
+        with open(os.path.join(self.directory, '1-0.json'), 'w') as file:
+            json.dump({'counters': [['yatube_comments_total', [], 2]],
+                       'histograms': []}, file)
+        text = self.client.get('/metrics').content.decode()
+        own = metrics._counters[('yatube_comments_total', ())]
+        self.assertEqual(self.value(text, 'yatube_comments_total'), own + 2)
+
+    def test_flush_only_when_serving(self):
+        """
+        Вне сервера метрики не пишутся ни по ходу запросов, ни при
+        выходе процесса.
+        """
+        metrics.inc('yatube_comments_total')
+        with override_settings(METRICS_FLUSH_INTERVAL=0):
+            self.client.get('/')
+            metrics.flush_at_exit()
+            self.assertEqual(os.listdir(self.directory), [])
+            metrics.serve()
+            self.addCleanup(metrics.serve, False)
+            self.client.get('/')
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_forbidden(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
@@ -1,5 +1,11 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import DatabaseError, connections
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from . import metrics as metrics_registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,33 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def health(request):
+    """
+    Доступность баз данных: 200, если все отвечают, иначе 503.
+    """
+    databases = {}
+    for alias in connections:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            databases[alias] = 'ok'
+        except DatabaseError:
+            databases[alias] = 'error'
+    healthy = all(state == 'ok' for state in databases.values())
+    return JsonResponse({'databases': databases},
+                        status=200 if healthy else 503)
+
+
+def metrics(request):
+    """
+    Метрики всех процессов для Prometheus.
+    Доступны только с адресов settings.METRICS_ALLOWED_IPS.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise PermissionDenied
+    metrics_registry.flush()
+    return HttpResponse(metrics_registry.render(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
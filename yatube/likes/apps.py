@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PostLikesConfig(AppConfig):
     name = 'likes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
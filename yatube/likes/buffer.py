@@ -0,0 +1,357 @@
+"""
+Отложенная запись лайков популярных постов.
+
+Когда пост получает больше settings.LIKES_BUFFER_HOT_RATE лайков
+в минуту, лайки не пишутся в PostLike сразу, а добавляются в журнал
+процесса (файл в settings.LIKES_JOURNAL_DIR). Раз в
+settings.LIKES_FLUSH_INTERVAL секунд журнал сбрасывается в базу одной
+транзакцией. До сброса состояние лайка и изменение счётчика хранятся
+в общем кэше, и чтение их учитывает.
+
+Несброшенное изменение счётчика и число событий поста — счётчики
+кэша, поэтому кэш должен выполнять incr атомарно (core.cache.
+FileBasedCache, memcached, locmem; не DatabaseCache). Счётчики
+увеличиваются до записи события в журнал, так что сброс, который
+уже видит событие, всегда вычитает учтённое значение. Пост, у которого
+после сброса не осталось событий, выходит из буфера: его счётчики
+удаляются, даже если расходятся с нулём.
+
+Журнал переживает падение процесса: журналы завершившихся процессов
+подхватывает следующий сброс или команда flush_likes. Повторное
+применение журнала безопасно — в базу пишется итоговое состояние.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.cache import COUNTERS_SCOPE, bump, post_scope
+from posts.models import Post, User
+from .models import PostLike
+
+logger = logging.getLogger(__name__)
+
+RATE_KEY = 'likes:rate:{}:{}'
+DELTA_KEY = 'likes:delta:{}'
+EVENTS_KEY = 'likes:events:{}'
+STATE_KEY = 'likes:state:{}:{}'
+JOURNAL_SUFFIX = '.journal'
+FLUSHING_SUFFIX = '.flushing'
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_journal = None
+_journal_pid = None
+_timer = None
+
+
+def is_enabled():
+    return settings.LIKES_BUFFER_HOT_RATE is not None
+
+
+def is_buffered(post_id):
+    """
+    Включает буфер для поста, который получает много лайков,
+    и оставляет его, пока у поста есть несброшенные лайки.
+    """
+    if not is_enabled():
+        return False
+    minute = int(time.time() // 60)
+    rate_key = RATE_KEY.format(post_id, minute)
+    events_key = EVENTS_KEY.format(post_id)
+    values = cache.get_many([rate_key, events_key])
+    if events_key in values:
+        return True
+    if not cache.add(rate_key, 1, 120):
+        try:
+            cache.incr(rate_key)
+        except ValueError:
+            pass
+    return values.get(rate_key, 0) >= settings.LIKES_BUFFER_HOT_RATE
+
+
+def journal_path(pid, suffix=JOURNAL_SUFFIX):
+    return os.path.join(settings.LIKES_JOURNAL_DIR, f'{pid}{suffix}')
+
+
+def append(event):
+    """
+    Дописывает событие в журнал процесса одной записью O_APPEND.
+    """
+    global _journal, _journal_pid
+    line = (json.dumps(event) + '\n').encode()
+    with _lock:
+        if _journal is None or _journal_pid != os.getpid():
+            os.makedirs(settings.LIKES_JOURNAL_DIR, exist_ok=True)
+            _journal = os.open(journal_path(os.getpid()),
+                               os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            _journal_pid = os.getpid()
+        os.write(_journal, line)
+        if settings.LIKES_JOURNAL_FSYNC:
+            os.fsync(_journal)
+    start_timer()
+
+
+def increment(key, delta):
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+        return delta
+
+
+def pending_delta(post_id):
+    return cache.get(DELTA_KEY.format(post_id), 0)
+
+
+def pending_state(post_id, user_id):
+    return cache.get(STATE_KEY.format(post_id, user_id))
+
+
+def toggle(post_id, user):
+    """
+    Переключает лайк через журнал. Возвращает пару
+    (лайк стоит, несброшенное изменение счётчика поста).
+    """
+    state_key = STATE_KEY.format(post_id, user.id)
+    delta_key = DELTA_KEY.format(post_id)
+    liked = cache.get(state_key)
+    if liked is None:
+        liked = PostLike.objects.filter(post_id=post_id, user=user,
+                                        is_like=True).exists()
+    liked = not liked
+    delta = 1 if liked else -1
+    cache.set(state_key, liked, None)
+    # Счётчики — до журнала: сброс не должен вычесть событие,
+    # которое ещё не учтено.
+    increment(EVENTS_KEY.format(post_id), 1)
+    pending = increment(delta_key, delta)
+    append({'post': post_id, 'user': user.id,
+            'liked': liked, 'delta': delta})
+    return liked, pending
+
+
+def add(post_id, user):
+    """
+    Ставит лайк через журнал, если он ещё не стоит.
+    """
+    liked = pending_state(post_id, user.id)
+    if liked is None:
+        liked = PostLike.objects.filter(post_id=post_id, user=user,
+                                        is_like=True).exists()
+    if not liked:
+        toggle(post_id, user)
+
+
+def attach_pending(posts, user):
+    """
+    Учитывает несброшенные лайки в атрибутах страницы постов:
+    likes_count и is_liked. Одно обращение к кэшу.
+    """
+    if not posts or not is_enabled():
+        return
+    keys = [DELTA_KEY.format(post.id) for post in posts]
+    if user.is_authenticated:
+        keys += [STATE_KEY.format(post.id, user.id) for post in posts]
+    values = cache.get_many(keys)
+    if not values:
+        return
+    for post in posts:
+        post.likes_count += values.get(DELTA_KEY.format(post.id), 0)
+        liked = values.get(STATE_KEY.format(post.id, user.id))
+        if liked is not None:
+            post.is_liked = liked
+
+
+def read_events(path):
+    """
+    События журнала. Недописанная при падении строка пропускается.
+    """
+    events = []
+    with open(path, 'rb') as journal:
+        for line in journal:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.warning('Пропущена повреждённая запись %s', path)
+    return events
+
+
+def apply(events):
+    """
+    Записывает итоговое состояние лайков в базу одной транзакцией
+    и пересчитывает счётчики затронутых постов.
+    """
+    final = {}
+    deltas = Counter()
+    counts = Counter()
+    for event in events:
+        final[event['post'], event['user']] = event['liked']
+        deltas[event['post']] += event['delta']
+        counts[event['post']] += 1
+    if not final:
+        return
+    # Лайки удалённых постов и пользователей отбрасываются.
+    post_ids = set(Post.objects.filter(pk__in=deltas)
+                   .values_list('id', flat=True))
+    user_ids = set(User.objects
+                   .filter(pk__in={user_id for _, user_id in final})
+                   .values_list('id', flat=True))
+    liked = [(post_id, user_id) for (post_id, user_id), value
+             in final.items()
+             if value and post_id in post_ids and user_id in user_ids]
+    unliked = [pair for pair, value in final.items() if not value]
+    with transaction.atomic():
+        PostLike.objects.bulk_create(
+            [PostLike(post_id=post_id, user_id=user_id, is_like=True)
+             for post_id, user_id in liked],
+            batch_size=settings.LIKES_FLUSH_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        if unliked:
+            PostLike.objects.filter(reduce(or_, [
+                Q(post_id=post_id, user_id=user_id)
+                for post_id, user_id in unliked
+            ])).delete()
+        Post.objects.filter(pk__in=deltas).update(
+            likes_count=Coalesce(Subquery(
+                PostLike.objects
+                .filter(post=OuterRef('pk'), is_like=True)
+                .order_by()
+                .values('post')
+                .annotate(count=Count('pk'))
+                .values('count')
+            ), 0),
+            version=F('version') + 1
+        )
+    drained = []
+    for post_id, delta in deltas.items():
+        delta_key = DELTA_KEY.format(post_id)
+        events_key = EVENTS_KEY.format(post_id)
+        try:
+            events = cache.decr(events_key, counts[post_id])
+        except ValueError:
+            events = 0
+        if events > 0:
+            try:
+                cache.decr(delta_key, delta)
+            except ValueError:
+                pass
+        else:
+            drained += [delta_key, events_key]
+    # Пост без несброшенных лайков снова пишется в базу напрямую,
+    # счётчик поста в базе уже точный.
+    cache.delete_many(drained)
+    # Состояние, изменённое после начала сброса, остаётся в кэше.
+    state_keys = {STATE_KEY.format(*pair): value
+                  for pair, value in final.items()}
+    cache.delete_many([key for key, value
+                       in cache.get_many(state_keys).items()
+                       if value == state_keys[key]])
+    bump(COUNTERS_SCOPE, *[post_scope(post_id) for post_id in deltas])
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def claim_target():
+    return journal_path(f'{os.getpid()}-{time.time_ns()}', FLUSHING_SUFFIX)
+
+
+def claim_journals():
+    """
+    Забирает на сброс журнал своего процесса и журналы
+    завершившихся процессов. Переименование атомарно, поэтому
+    каждый журнал достаётся одному процессу.
+    """
+    global _journal
+    pid = os.getpid()
+    own = journal_path(pid)
+    claimed = []
+    with _lock:
+        # Пока держим блокировку, в журнал процесса никто не пишет.
+        if _journal is not None and _journal_pid == pid:
+            os.close(_journal)
+            _journal = None
+        if os.path.exists(own):
+            claimed.append(claim_target())
+            os.rename(own, claimed[-1])
+    try:
+        names = sorted(os.listdir(settings.LIKES_JOURNAL_DIR))
+    except FileNotFoundError:
+        return claimed
+    for name in names:
+        path = os.path.join(settings.LIKES_JOURNAL_DIR, name)
+        owner = name.split('.')[0].split('-')[0]
+        if path == own or path in claimed or not owner.isdigit():
+            continue
+        if int(owner) != pid and is_alive(int(owner)):
+            continue
+        target = claim_target()
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            continue
+        claimed.append(target)
+    return claimed
+
+
+def flush():
+    """
+    Сбрасывает журналы в базу. Возвращает число событий.
+    Новые лайки во время сброса пишутся в новый журнал.
+    """
+    flushed = 0
+    with _flush_lock:
+        for path in claim_journals():
+            events = read_events(path)
+            apply(events)
+            os.remove(path)
+            flushed += len(events)
+    return flushed
+
+
+def flush_in_thread():
+    global _timer
+    try:
+        flush()
+    except Exception:
+        logger.exception('Не удалось сбросить журнал лайков')
+    finally:
+        connections.close_all()
+        with _lock:
+            _timer = None
+            restart = _journal is not None
+        if restart:
+            start_timer()
+
+
+def start_timer():
+    global _timer
+    if not settings.LIKES_FLUSH_INTERVAL:
+        return
+    with _lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(settings.LIKES_FLUSH_INTERVAL,
+                                 flush_in_thread)
+        _timer.daemon = True
+        _timer.start()
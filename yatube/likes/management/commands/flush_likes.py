@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from likes import buffer
+
+
+class Command(BaseCommand):
+    help = ('Сбрасывает в базу журналы отложенных лайков, '
+            'в том числе оставшиеся после падения процессов')
+
+    def handle(self, *args, **options):
+        flushed = buffer.flush()
+        self.stdout.write(f'Сброшено событий: {flushed}')
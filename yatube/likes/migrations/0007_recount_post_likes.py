@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-18 10:51
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def recount_likes(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostLike = apps.get_model('likes', 'PostLike')
+    likes = (PostLike.objects
+             .filter(post=OuterRef('pk'), is_like=True)
+             .order_by()
+             .values('post')
+             .annotate(count=Count('pk'))
+             .values('count'))
+    Post.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('likes', '0006_alter_postlike_id'),
+        ('posts', '0020_post_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_likes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-18 10:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def delete_duplicate_likes(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostLike = apps.get_model('likes', 'PostLike')
+    keep = (PostLike.objects
+            .values('post', 'user')
+            .annotate(keep=Min('id'))
+            .values('keep'))
+    PostLike.objects.exclude(id__in=keep).delete()
+    likes = (PostLike.objects
+             .filter(post=OuterRef('pk'), is_like=True)
+             .order_by()
+             .values('post')
+             .annotate(count=Count('pk'))
+             .values('count'))
+    Post.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_hot_path_indexes'),
+        ('likes', '0007_recount_post_likes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postlike',
+            name='post',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='posts.post'),
+        ),
+        migrations.RunPython(delete_duplicate_likes,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='postlike',
+            constraint=models.UniqueConstraint(fields=('post', 'user'), name='unique_post_like'),
+        ),
+    ]
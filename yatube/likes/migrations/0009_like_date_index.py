@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('likes', '0008_unique_post_like'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postlike',
+            index=models.Index(fields=['like_date'], name='postlike_like_date_idx'),
+        ),
+    ]
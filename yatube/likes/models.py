@@ -9,7 +9,8 @@ class PostLike(models.Model):
     post = models.ForeignKey(Post,
                              on_delete=models.CASCADE,
                              blank=True,
-                             null=True)
+                             null=True,
+                             db_index=False)
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
                              null=True)
@@ -23,6 +24,14 @@ class PostLike(models.Model):
         verbose_name = 'Post Like'
         verbose_name_plural = 'Post Likes'
         ordering = ["-like_date"]
+        constraints = [
+            models.UniqueConstraint(fields=('post', 'user'),
+                                    name='unique_post_like'),
+        ]
+        indexes = [
+            models.Index(fields=('like_date',),
+                         name='postlike_like_date_idx'),
+        ]
 
 
 # TODO Comments likes
@@ -0,0 +1,51 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.cache import COUNTERS_SCOPE, bump, post_scope
+from posts.models import Post
+from .models import PostLike
+
+
+@receiver(post_save, sender=PostLike)
+def like_saved(sender, instance, created, **kwargs):
+    """
+    Обновляет счётчик лайков и версию поста.
+    Изменение существующего лайка пересчитывает счётчик целиком.
+    """
+    if not instance.post_id:
+        return
+    if created:
+        if instance.is_like:
+            Post.objects.filter(pk=instance.post_id).update(
+                likes_count=F('likes_count') + 1,
+                version=F('version') + 1
+            )
+        return
+    Post.objects.filter(pk=instance.post_id).update(
+        likes_count=PostLike.objects.filter(
+            post_id=instance.post_id, is_like=True
+        ).count(),
+        version=F('version') + 1
+    )
+
+
+@receiver(post_delete, sender=PostLike)
+def like_deleted(sender, instance, **kwargs):
+    """
+    Уменьшает счётчик лайков поста,
+    в том числе при каскадном удалении.
+    """
+    if instance.post_id and instance.is_like:
+        Post.objects.filter(pk=instance.post_id,
+                            likes_count__gt=0).update(
+            likes_count=F('likes_count') - 1,
+            version=F('version') + 1
+        )
+
+
+@receiver(post_save, sender=PostLike)
+@receiver(post_delete, sender=PostLike)
+def like_changed(sender, instance, **kwargs):
+    if instance.post_id:
+        bump(COUNTERS_SCOPE, post_scope(instance.post_id))
@@ -1,12 +1,27 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
-from django.test import TestCase, Client
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from io import StringIO
 
 from http import HTTPStatus
 
 from posts.models import Post, Group, User
+from . import buffer
 from .models import PostLike
+from .utils import attach_like_state
+
+TEMP_JOURNAL_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class PostLikeTest(TestCase):
@@ -28,6 +43,7 @@ class PostLikeTest(TestCase):
                                            is_like=True)
 
     def setUp(self):
+        cache.clear()
         self.author_authorized_client = Client()
         self.first_authorized_client = Client()
         self.second_authorized_client = Client()
@@ -84,9 +100,243 @@ class PostLikeTest(TestCase):
         ).exists())
         self.assertNotEqual(like_count, new_like_count)
 
+    def test_attach_like_state(self):
+        """
+        Состояние лайков страницы загружается одним запросом.
+        """
+        other_post = Post.objects.create(text='other_text',
+                                         author=self.author)
+        posts = list(
+            Post.objects.filter(id__in=(self.post.id, other_post.id))
+        )
+        with self.assertNumQueries(1):
+            posts = attach_like_state(posts, self.first_user)
+        state = {post.id: post for post in posts}
+        self.assertEqual(state[self.post.id].likes_count, 1)
+        self.assertTrue(state[self.post.id].is_liked)
+        self.assertEqual(state[self.post.id].post_likes_id, self.like.id)
+        self.assertEqual(state[other_post.id].likes_count, 0)
+        self.assertFalse(state[other_post.id].is_liked)
+        self.assertIsNone(state[other_post.id].post_likes_id)
+
+    def like_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.second_authorized_client.get(
+                reverse('posts:index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return [query for query in context.captured_queries
+                if 'likes_postlike' in query['sql']]
+
+    def test_index_like_queries_do_not_grow_with_posts(self):
+        """
+        Количество запросов лайков на главной странице
+        не зависит от количества постов.
+        """
+        self.assertEqual(len(self.like_queries()), 1)
+        for i in range(3):
+            post = Post.objects.create(text=f'text {i}', author=self.author)
+            PostLike.objects.create(post=post, user=self.first_user,
+                                    is_like=True)
+        self.assertEqual(len(self.like_queries()), 1)
+
     def test_guest_client_not_add_like(self):
         """
         Проверка запрета добавления лайка
         для неавторизованого пользователя.
         """
         pass
+
+    def test_toggle_like(self):
+        """
+        Повторное нажатие снимает лайк.
+        """
+        url = reverse('likes:toggle')
+        data = {'post_id': self.post.id, 'url_from': '/'}
+        response = self.second_authorized_client.post(url, data=data)
+        self.assertRedirects(response, '/')
+        self.assertTrue(PostLike.objects.filter(
+            post=self.post, user=self.second_user, is_like=True).exists())
+        self.second_authorized_client.post(url, data=data)
+        self.assertFalse(PostLike.objects.filter(
+            post=self.post, user=self.second_user).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_toggle_like_json(self):
+        """
+        AJAX-запрос получает новое состояние и число лайков.
+        """
+        response = self.second_authorized_client.post(
+            reverse('likes:toggle'),
+            data={'post_id': self.post.id},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'post_id': self.post.id,
+                                           'liked': True,
+                                           'likes_count': 2})
+        response = self.first_authorized_client.post(
+            reverse('likes:toggle'),
+            data={'post_id': self.post.id},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'post_id': self.post.id,
+                                           'liked': False,
+                                           'likes_count': 1})
+
+    def test_toggle_missing_post(self):
+        """
+        Лайк несуществующего поста — 404 без записи в базе.
+        """
+        response = self.second_authorized_client.post(
+            reverse('likes:toggle'), data={'post_id': 10 ** 6})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(PostLike.objects.filter(
+            user=self.second_user).exists())
+
+    def test_double_add_like(self):
+        """
+        Двойной клик по «лайку» создаёт один лайк.
+        """
+        data = {'post_id': self.post.id, 'url_from': '/'}
+        for _ in range(2):
+            self.second_authorized_client.post(reverse('likes:add'),
+                                               data=data)
+        self.assertEqual(PostLike.objects.filter(
+            post=self.post, user=self.second_user).count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+
+    def test_foreign_redirect_ignored(self):
+        """
+        Переход после лайка только внутри сайта.
+        """
+        response = self.second_authorized_client.post(
+            reverse('likes:toggle'),
+            data={'post_id': self.post.id,
+                  'url_from': 'https://example.com/'})
+        self.assertRedirects(response, reverse('posts:index'))
+
+
+def crash_after_likes(post_id, user_ids):
+    """
+    Воркер пишет лайки в журнал и падает, не сбросив их.
+    """
+    for user_id in user_ids:
+        buffer.append({'post': post_id, 'user': user_id,
+                       'liked': True, 'delta': 1})
+    with open(buffer.journal_path(os.getpid()), 'ab') as journal:
+        journal.write(b'{"post": ')
+    os._exit(1)
+
+
+@override_settings(LIKES_BUFFER_HOT_RATE=0,
+                   LIKES_FLUSH_INTERVAL=None,
+                   LIKES_JOURNAL_DIR=TEMP_JOURNAL_DIR)
+class LikeBufferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.users = [User.objects.create_user(username=f'user_{index}')
+                     for index in range(3)]
+        cls.post = Post.objects.create(text='hot_post', author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_JOURNAL_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_JOURNAL_DIR, ignore_errors=True)
+        self.clients = []
+        for user in self.users:
+            client = Client()
+            client.force_login(user)
+            self.clients.append(client)
+
+    def tearDown(self):
+        # Закрывает журнал процесса: setUp следующего теста удаляет
+        # каталог, и открытый журнал остался бы удалённым файлом.
+        buffer.flush()
+
+    def toggle(self, client):
+        return client.post(reverse('likes:toggle'),
+                           data={'post_id': self.post.id},
+                           HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()
+
+    def test_buffered_likes_merged_on_read(self):
+        """
+        Лайки популярного поста пишутся в журнал,
+        а страницы и ответы учитывают их до сброса.
+        """
+        for client in self.clients:
+            data = self.toggle(client)
+        self.assertEqual(data['likes_count'], 3)
+        self.assertFalse(PostLike.objects.exists())
+        data = self.toggle(self.clients[0])
+        self.assertEqual(data, {'post_id': self.post.id,
+                                'liked': False,
+                                'likes_count': 2})
+        response = self.clients[1].get(reverse('posts:index'))
+        post = response.context['page_obj'][0]
+        self.assertEqual(post.likes_count, 2)
+        self.assertTrue(post.is_liked)
+
+    def test_flush_writes_final_state(self):
+        """
+        Сброс записывает итоговое состояние и обнуляет буфер.
+        """
+        for client in self.clients:
+            self.toggle(client)
+        self.toggle(self.clients[0])
+        out = StringIO()
+        call_command('flush_likes', stdout=out)
+        self.assertIn('Сброшено событий: 4', out.getvalue())
+        self.assertEqual(
+            set(PostLike.objects.values_list('user_id', flat=True)),
+            {self.users[1].id, self.users[2].id})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        self.assertEqual(buffer.pending_delta(self.post.id), 0)
+        self.assertEqual(self.toggle(self.clients[0])['likes_count'], 3)
+
+    def test_concurrent_toggles(self):
+        """
+        Одновременные лайки разных пользователей не теряются,
+        после сброса пост выходит из буфера.
+        """
+        users = [User(id=self.author.id + 1000 + index)
+                 for index in range(64)]
+        User.objects.bulk_create(
+            [User(id=user.id, username=f'hot_{user.id}') for user in users])
+        for user in users:
+            # Состояние из кэша: потокам не нужна база.
+            cache.set(buffer.STATE_KEY.format(self.post.id, user.id),
+                      False, None)
+        with ThreadPoolExecutor(16) as executor:
+            list(executor.map(
+                lambda user: buffer.toggle(self.post.id, user), users))
+        self.assertEqual(buffer.pending_delta(self.post.id), 64)
+        self.assertEqual(buffer.flush(), 64)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 64)
+        self.assertIsNone(cache.get(buffer.DELTA_KEY.format(self.post.id)))
+        self.assertIsNone(cache.get(buffer.EVENTS_KEY.format(self.post.id)))
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(),
+                         'нужен запуск процессов через fork')
+    def test_crash_recovery(self):
+        """
+        Лайки из журнала упавшего процесса не теряются.
+        """
+        context = multiprocessing.get_context('fork')
+        process = context.Process(
+            target=crash_after_likes,
+            args=(self.post.id, [user.id for user in self.users]))
+        process.start()
+        process.join(10)
+        self.assertEqual(process.exitcode, 1)
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(PostLike.objects.filter(post=self.post).count(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 3)
+        self.assertEqual(buffer.flush(), 0)
@@ -1,12 +1,13 @@
 from django.urls import path, include
 
-from .views import AddLikeView, RemoveLikeView
+from .views import AddLikeView, RemoveLikeView, ToggleLikeView
 
 
 app_name = 'likes'
 
 urlpatterns = [
     path('likes/', include([
+        path('toggle/', ToggleLikeView.as_view(), name='toggle'),
         path('add/', AddLikeView.as_view(), name='add'),
         path('remove/', RemoveLikeView.as_view(), name='remove'),
     ])),
@@ -0,0 +1,110 @@
+from django.db import IntegrityError, transaction
+from django.http import Http404
+
+from core import metrics
+from posts.models import Post
+from . import buffer
+from .models import PostLike
+
+
+def attach_like_state(posts, user):
+    """
+    Загружает состояние лайков пользователя для страницы постов
+    одним запросом и сохраняет его в атрибутах постов: is_liked,
+    post_likes_id. Количество лайков хранится в Post.likes_count.
+    """
+    posts = list(posts)
+    for post in posts:
+        post.is_liked = False
+        post.post_likes_id = None
+    if not posts:
+        return posts
+    if not user.is_authenticated:
+        buffer.attach_pending(posts, user)
+        return posts
+    state = {
+        post_id: (like_id, is_like)
+        for post_id, like_id, is_like in (
+            PostLike.objects
+            .filter(post_id__in=[post.id for post in posts],
+                    user_id=user.id)
+            .values_list('post_id', 'id', 'is_like')
+            .order_by()
+        )
+    }
+    for post in posts:
+        if post.id in state:
+            post.post_likes_id, post.is_liked = state[post.id]
+    buffer.attach_pending(posts, user)
+    return posts
+
+
+def get_likes_count(post_id):
+    """
+    Счётчик лайков поста. Отсутствие поста — 404: тогда транзакция
+    лайка откатывается.
+    """
+    count = (Post.objects
+             .filter(pk=post_id)
+             .values_list('likes_count', flat=True)
+             .first())
+    if count is None:
+        raise Http404('Пост не найден')
+    return count
+
+
+def add_like(post_id, user):
+    """
+    Ставит лайк. Повторный лайк ничего не меняет:
+    дубликат отсекает ограничение unique_post_like.
+    Возвращает новое число лайков поста.
+    Лайки популярных постов пишутся через журнал likes.buffer.
+    """
+    metrics.inc('yatube_likes_total', action='like')
+    if buffer.is_buffered(post_id):
+        likes_count = get_likes_count(post_id)
+        buffer.add(post_id, user)
+        return likes_count + buffer.pending_delta(post_id)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                PostLike.objects.create(post_id=post_id, user=user,
+                                        is_like=True)
+        except IntegrityError:
+            pass
+        return get_likes_count(post_id)
+
+
+def toggle_like(post_id, user):
+    """
+    Ставит лайк, а если он уже стоит — снимает.
+    Вставка без предварительного чтения: существующий лайк
+    обнаруживается по нарушению уникальности.
+    Возвращает пару (лайк стоит, число лайков поста).
+    Лайки популярных постов пишутся через журнал likes.buffer.
+    """
+    if buffer.is_buffered(post_id):
+        likes_count = get_likes_count(post_id)
+        liked, pending = buffer.toggle(post_id, user)
+        metrics.inc('yatube_likes_total',
+                    action='like' if liked else 'unlike')
+        return liked, likes_count + pending
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                PostLike.objects.create(post_id=post_id, user=user,
+                                        is_like=True)
+            liked = True
+        except IntegrityError:
+            like = (PostLike.objects
+                    .select_for_update()
+                    .get(post_id=post_id, user=user))
+            liked = not like.is_like
+            if liked:
+                like.is_like = True
+                like.save()
+            else:
+                like.delete()
+        likes_count = get_likes_count(post_id)
+    metrics.inc('yatube_likes_total', action='like' if liked else 'unlike')
+    return liked, likes_count
@@ -1,31 +1,59 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import redirect
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.generic import View
 
-from posts.models import Post, User
 from .models import PostLike
+from .utils import add_like, toggle_like
 
 
-class AddLikeView(View):
+def get_post_id(request):
+    try:
+        return int(request.POST.get('post_id'))
+    except (TypeError, ValueError):
+        raise Http404('Пост не найден')
+
+
+def redirect_back(request):
+    url_from = request.POST.get('url_from')
+    if not url_has_allowed_host_and_scheme(
+            url_from, allowed_hosts={request.get_host()},
+            require_https=request.is_secure()):
+        url_from = 'posts:index'
+    return redirect(url_from)
+
+
+def wants_json(request):
+    return (request.headers.get('x-requested-with') == 'XMLHttpRequest'
+            or 'application/json' in request.headers.get('accept', ''))
+
+
+class ToggleLikeView(LoginRequiredMixin, View):
+    """
+    Ставит или снимает лайк одним запросом. AJAX-запросу
+    возвращает JSON с новым состоянием и числом лайков.
+    """
     def post(self, request):
-        post_id = int(request.POST.get('post_id'))
-        user_id = int(request.POST.get('user_id'))
-        url_from = request.POST.get('url_from')
-        user_inst = User.objects.get(id=user_id)
-        post_inst = Post.objects.get(id=post_id)
-        try:
-            like_inst = PostLike.objects.get(post=post_inst, user=user_inst)
-        except Exception as e:
-            post_like = PostLike(post=post_inst,
-                                 user=user_inst,
-                                 is_like=True)
-            post_like.save()
-        return redirect(url_from)
-
-
-class RemoveLikeView(View):
+        post_id = get_post_id(request)
+        liked, likes_count = toggle_like(post_id, request.user)
+        if wants_json(request):
+            return JsonResponse({'post_id': post_id,
+                                 'liked': liked,
+                                 'likes_count': likes_count})
+        return redirect_back(request)
+
+
+class AddLikeView(LoginRequiredMixin, View):
+    def post(self, request):
+        add_like(get_post_id(request), request.user)
+        return redirect_back(request)
+
+
+class RemoveLikeView(LoginRequiredMixin, View):
     def post(self, request):
         likes_id = int(request.POST.get('post_likes_id'))
-        url_from = request.POST.get('url_from')
-        post_like = PostLike.objects.get(id=likes_id)
-        post_like.delete()
-        return redirect(url_from)
+        with transaction.atomic():
+            PostLike.objects.filter(id=likes_id, user=request.user).delete()
+        return redirect_back(request)
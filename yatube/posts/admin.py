@@ -1,8 +1,23 @@
 from django.contrib import admin
+
+from search.backends import get_backend
 from .models import Post, Group, Comment
 
 
-class PostAdmin(admin.ModelAdmin):
+class IndexedSearchMixin:
+    """
+    Поиск в админке через поисковый индекс вместо LIKE по полям.
+    """
+    search_method = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        search = getattr(get_backend(), self.search_method)
+        return search(queryset, search_term), False
+
+
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'title',
@@ -12,7 +27,8 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('title', 'group',)
-    search_fields = ('text',)
+    search_fields = ('title', 'text')
+    search_method = 'search_posts'
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
@@ -30,7 +46,7 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'post',
@@ -40,6 +56,7 @@ class CommentAdmin(admin.ModelAdmin):
     )
     list_editable = ('text',)
     search_fields = ('text',)
+    search_method = 'search_comments'
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
@@ -0,0 +1,178 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from core import metrics
+from core.db import is_lagging, stick_to_primary
+from .models import Post
+
+VERSION_KEY = 'posts:version:{}'
+PAGE_KEY = 'posts:page:{}'
+# Счётчики лайков и комментариев на главной выводятся вне фрагментов
+# постов, поэтому их изменение не сбрасывает кэш фрагментов.
+COUNTERS_SCOPE = 'counters'
+# Порядок ленты популярных постов меняется при пересчёте оценок.
+POPULAR_SCOPE = 'popular'
+
+
+def group_scope(slug):
+    return f'group:{slug}' if slug else None
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_detail_scopes(request, post_id):
+    """
+    Страница поста зависит от поста, автора (число постов)
+    и группы.
+    """
+    row = (Post.objects
+           .filter(pk=post_id)
+           .values_list('author__username', 'group__slug')
+           .first())
+    if row is None:
+        return None
+    username, slug = row
+    return [scope for scope in (post_scope(post_id),
+                                profile_scope(username),
+                                group_scope(slug)) if scope]
+
+
+def version_key(scope):
+    return VERSION_KEY.format(hashlib.md5(scope.encode()).hexdigest())
+
+
+def get_versions(*scopes):
+    """
+    Версии областей кэша. Отсутствующая версия создаётся,
+    поэтому вытеснение ключа версии не возвращает старые страницы.
+    Версия создаётся через add: если другой процесс успел создать
+    её раньше, используется его значение.
+    """
+    keys = {version_key(scope): scope for scope in scopes}
+    versions = {keys[key]: version
+                for key, version in cache.get_many(keys).items()}
+    missing = [key for key, scope in keys.items() if scope not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        versions.update({keys[key]: version
+                         for key, version in cache.get_many(missing).items()})
+    if is_lagging(bumped_at(version) for version in versions.values()):
+        # Реплика могла ещё не получить изменение: страница, которая
+        # попадёт в кэш под новой версией, читается из основной базы.
+        stick_to_primary()
+    return versions
+
+
+def bumped_at(version):
+    """
+    Время сброса из версии; у созданных через add версий — 0.
+    """
+    _, _, timestamp = version.partition(':')
+    return float(timestamp or 0)
+
+
+def bump(*scopes):
+    """
+    Делает недействительными страницы и фрагменты областей.
+    Версия — случайная строка, так что одновременные сбросы
+    из разных процессов не дают одинаковых версий, и время сброса.
+    """
+    now = time.time()
+    cache.set_many({version_key(scope): f'{uuid.uuid4().hex}:{now}'
+                    for scope in scopes if scope}, None)
+
+
+def digest(parts):
+    return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def attach_versions(posts):
+    """
+    Сохраняет в атрибуте cache_version версию фрагмента каждого поста.
+    Фрагмент зависит только от поста и его группы (ссылка на группу),
+    поэтому новый пост другого автора фрагменты не сбрасывает.
+    Версии всех постов страницы читаются одним обращением к кэшу.
+    """
+    posts = list(posts)
+    scopes = {
+        post.pk: [scope for scope in (
+            post_scope(post.pk),
+            group_scope(post.group.slug if post.group_id else None),
+        ) if scope]
+        for post in posts
+    }
+    versions = get_versions(*{scope for post_scopes in scopes.values()
+                              for scope in post_scopes})
+    for post in posts:
+        post.cache_version = digest([versions[scope]
+                                     for scope in scopes[post.pk]])
+    return posts
+
+
+def cache_anonymous_page(get_scopes, etag=False):
+    """
+    Кэширует страницу для анонимных пользователей.
+    get_scopes(request, **kwargs) возвращает области, от которых
+    зависит страница, или None, если страницу кэшировать нельзя.
+    От ленты ('index') зависят только страницы, которые её выводят:
+    новый пост не сбрасывает страницы других авторов и групп.
+    С etag=True страница получает ETag из версий областей и
+    пользователя, и на совпавший If-None-Match отвечает 304
+    без выполнения представления.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            anonymous = not request.user.is_authenticated
+            if request.method != 'GET' or not (anonymous or etag):
+                return view(request, *args, **kwargs)
+            scopes = get_scopes(request, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            versions = get_versions(*scopes)
+            parts = ([request.get_full_path()]
+                     + [versions[scope] for scope in scopes])
+            page_etag = None
+            if etag:
+                page_etag = quote_etag(digest(parts + [str(request.user.pk)]))
+                not_modified = get_conditional_response(request,
+                                                        etag=page_etag)
+                if not_modified is not None:
+                    metrics.inc('yatube_page_cache_requests_total',
+                                result='not_modified')
+                    return not_modified
+            key = PAGE_KEY.format(digest(parts))
+            cached = cache.get(key) if anonymous else None
+            if anonymous:
+                metrics.inc('yatube_page_cache_requests_total',
+                            result='miss' if cached is None else 'hit')
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = view(request, *args, **kwargs)
+                if (anonymous and response.status_code == 200
+                        and not response.streaming):
+                    cache.set(key,
+                              (response.content, response['Content-Type']),
+                              settings.PAGE_CACHE_TIMEOUT)
+            if page_etag and response.status_code == 200:
+                response['ETag'] = page_etag
+            return response
+        return wrapper
+    return decorator
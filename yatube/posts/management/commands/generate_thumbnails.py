@@ -0,0 +1,39 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие превью изображений постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Число процессов, по умолчанию — ядер; '
+                                 '0 — без пула процессов')
+        parser.add_argument('--chunk-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        names = list(Post.objects
+                     .exclude(image='')
+                     .order_by()
+                     .values_list('image', flat=True)
+                     .distinct())
+        if options['workers'] == 0:
+            results = list(map(thumbnails.try_generate, names))
+        else:
+            # Процессы пула открывают собственные соединения.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'],
+                                     initializer=django.setup) as pool:
+                results = list(pool.map(thumbnails.try_generate, names,
+                                        chunksize=options['chunk_size']))
+        created = [name for name, done in zip(names, results) if done]
+        thumbnails.bump_posts(created)
+        self.stdout.write(
+            f'Изображений: {len(names)}, создано превью: {len(created)}')
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from likes.models import PostLike
+from posts.models import Comment, Post
+
+
+def count_subquery(queryset):
+    return Coalesce(Subquery(queryset
+                             .filter(post=OuterRef('pk'))
+                             .order_by()
+                             .values('post')
+                             .annotate(count=Count('pk'))
+                             .values('count')), 0)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает разошедшиеся счётчики лайков и комментариев постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        drifted = (Post.objects
+                   .annotate(
+                       real_likes=count_subquery(
+                           PostLike.objects.filter(is_like=True)),
+                       real_comments=count_subquery(Comment.objects),
+                   )
+                   .exclude(likes_count=F('real_likes'),
+                            comments_count=F('real_comments'))
+                   .only('id', 'likes_count', 'comments_count')
+                   .order_by())
+        fixed = 0
+        batch = []
+        with transaction.atomic():
+            for post in drifted.iterator(chunk_size=batch_size):
+                post.likes_count = post.real_likes
+                post.comments_count = post.real_comments
+                post.version = F('version') + 1
+                batch.append(post)
+                if len(batch) >= batch_size:
+                    fixed += self.save(batch)
+            fixed += self.save(batch)
+        self.stdout.write(f'Исправлено постов: {fixed}')
+
+    def save(self, batch):
+        Post.objects.bulk_update(batch, ('likes_count', 'comments_count',
+                                         'version'))
+        saved = len(batch)
+        batch.clear()
+        return saved
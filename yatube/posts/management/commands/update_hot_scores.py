@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import popular
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает оценки популярности постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = popular.update_scores(batch_size=options['batch_size'])
+        self.stdout.write(f'Популярных постов: {count}')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Загружает в кэш записи превью новых постов '
+            'и создаёт недостающие превью')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200,
+                            help='Сколько новых постов с изображениями')
+
+    def handle(self, *args, **options):
+        names = list(Post.objects
+                     .exclude(image='')
+                     .values_list('image', flat=True)
+                     [:options['count']])
+        urls = thumbnails.get_urls(names)
+        missing = [name for name, url in urls.items() if url is None]
+        created = [name for name in missing if thumbnails.try_generate(name)]
+        thumbnails.bump_posts(created)
+        self.stdout.write(f'Изображений: {len(urls)}, '
+                          f'в кэше: {len(urls) - len(missing)}, '
+                          f'создано превью: {len(created)}')
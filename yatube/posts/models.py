@@ -1,8 +1,20 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.text import Truncator
 
 User = get_user_model()
 
+EXCERPT_ELLIPSIS = '…'
+
+
+def make_excerpt(text):
+    """
+    Первые settings.QTY_WORDS слов текста для лент.
+    """
+    return Truncator(text).words(settings.QTY_WORDS,
+                                 truncate=EXCERPT_ELLIPSIS)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -21,17 +33,22 @@ class Post(models.Model):
                              help_text='Введите заголовок поста')
     text = models.TextField(verbose_name='Текст поста',
                             help_text='Введите текст поста')
+    excerpt = models.TextField(verbose_name='Начало текста',
+                               blank=True,
+                               editable=False)
     pub_date = models.DateTimeField(verbose_name='Дата публикации',
                                     auto_now_add=True)
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                related_name='posts',
-                               verbose_name='Автор')
+                               verbose_name='Автор',
+                               db_index=False)
     group = models.ForeignKey(Group,
                               blank=True,
                               null=True,
                               on_delete=models.CASCADE,
                               related_name='posts',
+                              db_index=False,
                               verbose_name='Группа',
                               help_text=('Группа, к которой будет'
                                          ' относиться пост'))
@@ -40,12 +57,49 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    likes_count = models.PositiveIntegerField(
+        verbose_name='Количество лайков',
+        default=0,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=1,
+        editable=False
+    )
+    hot_score = models.FloatField(
+        verbose_name='Популярность',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.text
 
+    @property
+    def has_more_text(self):
+        """
+        Текст длиннее выдержки, полный текст ленты загружают отдельно.
+        """
+        return self.excerpt.endswith(EXCERPT_ELLIPSIS)
+
     class Meta:
-        ordering = ["-pub_date"]
+        ordering = ["-pub_date", "-id"]
+        indexes = [
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=('-hot_score', '-id'),
+                         name='post_hot_score_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -53,7 +107,8 @@ class Comment(models.Model):
                              on_delete=models.CASCADE,
                              blank=True,
                              null=True,
-                             related_name='comments')
+                             related_name='comments',
+                             db_index=False)
     text = models.TextField(verbose_name='Текст комментария',
                             help_text='Введите текст комментария')
     author = models.ForeignKey(User,
@@ -64,13 +119,20 @@ class Comment(models.Model):
                                    auto_now_add=True)
 
     class Meta:
-        ordering = ["-created"]
+        ordering = ["-created", "-id"]
+        indexes = [
+            models.Index(fields=('post', '-created', '-id'),
+                         name='comment_post_created_idx'),
+            models.Index(fields=('created',),
+                         name='comment_created_idx'),
+        ]
 
 
 class Follow(models.Model):
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
-                             related_name='follower'
+                             related_name='follower',
+                             db_index=False
                              )
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
@@ -79,3 +141,34 @@ class Follow(models.Model):
 
     class Meta:
         ordering = ["-author"]
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_follow'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline',
+                             db_index=False)
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date", "-post"]
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_timeline_post'),
+        ]
+        indexes = [
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=('user', 'author', '-pub_date'),
+                         name='timeline_user_author_idx'),
+        ]
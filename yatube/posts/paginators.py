@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class CursorPage:
+    """
+    Страница курсорного пагинатора. Повторяет интерфейс
+    django.core.paginator.Page, нужный шаблонам.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Пагинатор по ключу сортировки вместо OFFSET и COUNT(*).
+    ordering — убывающие поля, последнее из них уникально,
+    например ('-pub_date', '-id').
+    """
+    def __init__(self, queryset, per_page, ordering=('-pub_date', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in ordering
+        ]
+
+    def encode_cursor(self, direction, obj):
+        position = [str(field.value_from_object(obj))
+                    for field in self.fields]
+        data = json.dumps([direction] + position).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, *position = json.loads(
+                base64.urlsafe_b64decode(cursor.encode()))
+            if direction not in ('next', 'prev'):
+                return None
+            if len(position) != len(self.fields):
+                return None
+            return direction, [
+                field.to_python(value)
+                for field, value in zip(self.fields, position)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            return None
+
+    def position_filter(self, position, lookup):
+        """
+        Условие «ключ строки меньше (больше) position»
+        для составного ключа сортировки. Отдельная граница по первому
+        полю позволяет базе читать индекс диапазоном.
+        """
+        condition = Q()
+        for index in reversed(range(len(self.fields))):
+            equal = {field.attname: value for field, value
+                     in zip(self.fields[:index], position[:index])}
+            field = self.fields[index]
+            equal[f'{field.attname}__{lookup}'] = position[index]
+            condition |= Q(**equal)
+        first = self.fields[0].attname
+        return Q(**{f'{first}__{lookup}e': position[0]}) & condition
+
+    def get_page(self, cursor):
+        """
+        Возвращает страницу по курсору. Неверный курсор
+        ведёт на первую страницу.
+        """
+        decoded = self.decode_cursor(cursor) if cursor else None
+        descending = [f'-{field.attname}' for field in self.fields]
+        ascending = [field.attname for field in self.fields]
+        if decoded is None:
+            rows = list(self.queryset.order_by(*descending)
+                        [:self.per_page + 1])
+            has_more, has_less = len(rows) > self.per_page, False
+        else:
+            direction, position = decoded
+            if direction == 'next':
+                rows = list(self.queryset
+                            .filter(self.position_filter(position, 'lt'))
+                            .order_by(*descending)[:self.per_page + 1])
+                has_more, has_less = len(rows) > self.per_page, True
+            else:
+                rows = list(self.queryset
+                            .filter(self.position_filter(position, 'gt'))
+                            .order_by(*ascending)[:self.per_page + 1])
+                has_less, has_more = len(rows) > self.per_page, True
+                rows = rows[:self.per_page][::-1]
+        rows = rows[:self.per_page]
+        next_cursor = previous_cursor = None
+        if rows and has_more:
+            next_cursor = self.encode_cursor('next', rows[-1])
+        if rows and has_less:
+            previous_cursor = self.encode_cursor('prev', rows[0])
+        return CursorPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,87 @@
+"""
+Оценки популярности постов для ленты «Популярные».
+
+Оценка — сумма лайков и комментариев за settings.HOT_SCORE_WINDOW,
+вес каждого убывает вдвое за settings.HOT_SCORE_HALF_LIFE.
+Оценки хранятся в индексированном столбце Post.hot_score и
+пересчитываются целиком командой update_hot_scores.
+
+Пересчёт читает только события окна (по индексам по дате) и считает
+оценки в базе одним GROUP BY на таблицу: вес события выбирается
+выражением CASE по его возрасту, округлённому до
+settings.HOT_SCORE_BUCKET, поэтому пользовательские функции SQLite
+для каждой строки не вызываются.
+"""
+from collections import Counter
+from math import ceil
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from likes.models import PostLike
+from .cache import POPULAR_SCOPE, bump
+from .models import Comment, Post
+
+
+def decayed_weight(field, now, weight):
+    """
+    Вес события по времени field: weight, убывающий вдвое
+    за период полураспада.
+    """
+    bucket = settings.HOT_SCORE_BUCKET
+    buckets = ceil(settings.HOT_SCORE_WINDOW / bucket)
+    half_life = settings.HOT_SCORE_HALF_LIFE
+    return Case(
+        *[When(**{f'{field}__gte': now - bucket * (index + 1)},
+               then=Value(weight * 0.5 ** ((index + 0.5) * bucket
+                                           / half_life)))
+          for index in range(buckets)],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def compute_scores(now=None):
+    """
+    Оценки постов с активностью в окне: {post_id: оценка}.
+    """
+    now = now or timezone.now()
+    start = now - settings.HOT_SCORE_WINDOW
+    scores = Counter()
+    sources = (
+        (PostLike.objects.filter(is_like=True, post__isnull=False),
+         'like_date', settings.HOT_SCORE_LIKE_WEIGHT),
+        (Comment.objects.filter(post__isnull=False),
+         'created', settings.HOT_SCORE_COMMENT_WEIGHT),
+    )
+    for queryset, field, weight in sources:
+        rows = (queryset
+                .filter(**{f'{field}__gte': start, f'{field}__lte': now})
+                .order_by()
+                .values('post_id')
+                .annotate(score=Sum(decayed_weight(field, now, weight)))
+                .values_list('post_id', 'score'))
+        for post_id, score in rows.iterator():
+            scores[post_id] += score
+    return scores
+
+
+def update_scores(now=None, batch_size=1000):
+    """
+    Записывает оценки одной транзакцией: оценки постов без
+    активности в окне обнуляются. Возвращает число постов
+    с ненулевой оценкой.
+    """
+    scores = compute_scores(now)
+    with transaction.atomic():
+        Post.objects.filter(hot_score__gt=0).update(hot_score=0)
+        Post.objects.bulk_update(
+            [Post(pk=post_id, hot_score=score)
+             for post_id, score in scores.items()],
+            ('hot_score',),
+            batch_size=batch_size,
+        )
+    bump(POPULAR_SCOPE)
+    return len(scores)
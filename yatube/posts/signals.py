@@ -0,0 +1,153 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import metrics
+from . import stats, thumbnails, timeline
+from .cache import (COUNTERS_SCOPE, bump, group_scope, post_scope,
+                    profile_scope)
+from .models import Comment, Follow, Group, Post, make_excerpt
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    """
+    Увеличивает счётчик комментариев и версию поста.
+    """
+    if not instance.post_id:
+        return
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1,
+            version=F('version') + 1
+        )
+        metrics.inc('yatube_comments_total')
+        return
+    Post.objects.filter(pk=instance.post_id).update(
+        version=F('version') + 1
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """
+    Уменьшает счётчик комментариев поста,
+    в том числе при каскадном удалении.
+    """
+    if instance.post_id:
+        Post.objects.filter(pk=instance.post_id,
+                            comments_count__gt=0).update(
+            comments_count=F('comments_count') - 1,
+            version=F('version') + 1
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_edited(sender, instance, created, raw, **kwargs):
+    """
+    Увеличивает версию поста при редактировании.
+    """
+    if not created and not raw:
+        Post.objects.filter(pk=instance.pk).update(
+            version=F('version') + 1
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    """
+    Раскладывает новый пост по лентам подписчиков.
+    """
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, **kwargs):
+    """
+    Ставит превью изображения в очередь после фиксации транзакции.
+    """
+    if instance.image:
+        thumbnails.enqueue_on_commit(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def post_count_created(sender, instance, created, **kwargs):
+    if created:
+        stats.post_changed(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_count_deleted(sender, instance, **kwargs):
+    stats.post_changed(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        timeline.follow(instance.user_id, instance.author_id)
+        stats.follow_changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.author_id)
+    stats.follow_changed(instance.user_id)
+
+
+@receiver(pre_save, sender=Post)
+def fill_excerpt(sender, instance, **kwargs):
+    """
+    Сохраняет начало текста, которое выводят ленты вместо текста.
+    """
+    instance.excerpt = make_excerpt(instance.text)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    """
+    Запоминает прежнюю группу, чтобы сбросить и её страницу.
+    """
+    instance._old_group_scope = None
+    if instance.pk is None:
+        return
+    if sender is Post:
+        slug = (Post.objects.filter(pk=instance.pk)
+                .values_list('group__slug', flat=True).first())
+    else:
+        slug = (Group.objects.filter(pk=instance.pk)
+                .values_list('slug', flat=True).first())
+    instance._old_group_scope = group_scope(slug)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    slug = instance.group.slug if instance.group_id else None
+    bump('index',
+         post_scope(instance.pk),
+         profile_scope(instance.author.username),
+         group_scope(slug),
+         getattr(instance, '_old_group_scope', None))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    bump(COUNTERS_SCOPE, post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    bump('index',
+         group_scope(instance.slug),
+         getattr(instance, '_old_group_scope', None))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    bump(profile_scope(instance.user.username),
+         profile_scope(instance.author.username))
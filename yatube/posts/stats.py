@@ -0,0 +1,76 @@
+"""
+Счётчики автора для страниц поста и профайла: постов, подписчиков
+и подписок.
+
+Значения хранятся в кэше, так что страница не считает COUNT по всем
+постам популярного автора при каждом просмотре. Сигналы Post и Follow
+удаляют устаревшие значения, следующий просмотр считает их заново.
+Число подписчиков ведёт лента подписок (timeline.followers_count_many).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Follow, Post
+from .timeline import followers_count_many
+
+POSTS_KEY = 'stats:posts:{}'
+FOLLOWING_KEY = 'stats:following:{}'
+
+
+def count_many(key, queryset, field, ids):
+    """
+    Количество строк queryset по значениям field из ids. Значения
+    берутся из кэша, недостающие считаются одним запросом.
+    """
+    keys = {key.format(pk): pk for pk in ids}
+    counts = {keys[cache_key]: value
+              for cache_key, value in cache.get_many(keys).items()}
+    missing = [pk for pk in ids if pk not in counts]
+    if missing:
+        fetched = dict.fromkeys(missing, 0)
+        fetched.update(queryset
+                       .filter(**{f'{field}__in': missing})
+                       .values_list(field)
+                       .annotate(count=Count('id'))
+                       .order_by())
+        cache.set_many({key.format(pk): count
+                        for pk, count in fetched.items()},
+                       settings.AUTHOR_STATS_CACHE_TIMEOUT)
+        counts.update(fetched)
+    return counts
+
+
+def posts_count(author_id):
+    return count_many(POSTS_KEY, Post.objects, 'author_id',
+                      [author_id])[author_id]
+
+
+def author_stats(author_id):
+    """
+    Счётчики автора: {'posts': …, 'followers': …, 'following': …}.
+    """
+    return {
+        'posts': posts_count(author_id),
+        'followers': followers_count_many([author_id])[author_id],
+        'following': count_many(FOLLOWING_KEY, Follow.objects, 'user_id',
+                                [author_id])[author_id],
+    }
+
+
+def reset(*keys):
+    """
+    Удаляет значения сразу и ещё раз после фиксации транзакции:
+    просмотр между ними мог посчитать и сохранить старое значение.
+    """
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def post_changed(author_id):
+    reset(POSTS_KEY.format(author_id))
+
+
+def follow_changed(user_id):
+    reset(FOLLOWING_KEY.format(user_id))
@@ -0,0 +1,25 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image_url(post):
+    """
+    Адрес превью изображения поста. Пока превью не создано,
+    возвращает исходное изображение и ставит превью в очередь.
+    Адреса страницы постов заранее загружает thumbnails.attach_urls.
+    """
+    image = post.image
+    if not image:
+        return ''
+    if hasattr(post, 'thumbnail_url'):
+        url = post.thumbnail_url
+    else:
+        url = thumbnails.get_url(image)
+    if url is None:
+        thumbnails.enqueue_on_commit(image.name)
+        return image.url
+    return url
@@ -0,0 +1,136 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from likes.models import PostLike
+from posts.cache import get_versions
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='test_title',
+            slug='test_slug',
+        )
+        cls.post = Post.objects.create(
+            text='test_post',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(PageCacheTest.reader)
+
+    def get_version(self):
+        return get_versions('index')['index']
+
+    def get(self, client, name, **kwargs):
+        return client.get(reverse(name, kwargs=kwargs)).content.decode()
+
+    def test_anonymous_page_served_from_cache(self):
+        """
+        Повторный запрос анонима не выполняет запросов к базе.
+        """
+        self.get(self.guest_client, 'posts:index')
+        with self.assertNumQueries(0):
+            self.get(self.guest_client, 'posts:index')
+
+    def test_comment_resets_index_counters(self):
+        """
+        Новый комментарий обновляет счётчик на закэшированной главной.
+        """
+        before = self.get(self.guest_client, 'posts:index')
+        Comment.objects.create(post=self.post,
+                               author=self.reader,
+                               text='fresh_comment')
+        after = self.get(self.guest_client, 'posts:index')
+        self.assertIn('Комментарии: 0', before)
+        self.assertIn('Комментарии: 1', after)
+
+    def test_like_keeps_post_fragments(self):
+        """
+        Лайк не сбрасывает фрагменты постов, только счётчики.
+        """
+        version = self.get_version()
+        PostLike.objects.create(post=self.post, user=self.reader,
+                                is_like=True)
+        self.assertEqual(version, self.get_version())
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response,
+                            '<span class="likes-qty">1</span>')
+
+    def test_follow_resets_profiles(self):
+        """
+        Подписка сбрасывает профили подписчика и автора.
+        """
+        self.get(self.guest_client, 'posts:profile', username='author')
+        self.get(self.guest_client, 'posts:profile', username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertIn('Подписок: 1',
+                      self.get(self.guest_client, 'posts:profile',
+                               username='reader'))
+        self.assertIn('Подписано: 1',
+                      self.get(self.guest_client, 'posts:profile',
+                               username='author'))
+
+    def test_unrelated_post_keeps_pages(self):
+        """
+        Новый пост другого автора сбрасывает ленту, но не страницы
+        и фрагменты чужого профиля и поста.
+        """
+        other = User.objects.create_user(username='other')
+        self.get(self.guest_client, 'posts:index')
+        self.get(self.guest_client, 'posts:profile', username='author')
+        self.get(self.guest_client, 'posts:post_detail', post_id=self.post.id)
+        Post.objects.create(text='unrelated_post', author=other)
+        with self.assertNumQueries(0):
+            self.get(self.guest_client, 'posts:profile', username='author')
+        # Страница поста только узнаёт автора и группу.
+        with self.assertNumQueries(1):
+            self.get(self.guest_client, 'posts:post_detail',
+                     post_id=self.post.id)
+        self.assertIn('unrelated_post',
+                      self.get(self.guest_client, 'posts:index'))
+        # Фрагмент старого поста на главной берётся из кэша.
+        Post.objects.filter(pk=self.post.pk).update(title='silent_title')
+        self.assertNotIn('silent_title',
+                         self.get(self.authorized_client, 'posts:index'))
+
+    def test_group_change_resets_group_page(self):
+        """
+        Перенос поста в другую группу сбрасывает страницы обеих групп.
+        """
+        other = Group.objects.create(title='other', slug='other_slug')
+        self.get(self.guest_client, 'posts:group_list', slug='test_slug')
+        self.get(self.guest_client, 'posts:group_list', slug='other_slug')
+        self.post.group = other
+        self.post.save()
+        self.assertNotIn('test_post',
+                         self.get(self.guest_client, 'posts:group_list',
+                                  slug='test_slug'))
+        self.assertIn('test_post',
+                      self.get(self.guest_client, 'posts:group_list',
+                               slug='other_slug'))
+
+    def test_authorized_fragments_reset_on_edit(self):
+        """
+        Авторизованный пользователь получает страницу без кэша,
+        а фрагменты постов сбрасываются при изменении поста.
+        """
+        self.get(self.authorized_client, 'posts:index')
+        Post.objects.filter(pk=self.post.pk).update(text='silent_update')
+        self.assertNotIn('silent_update',
+                         self.get(self.authorized_client, 'posts:index'))
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'edited_post'
+        post.save()
+        self.assertIn('edited_post',
+                      self.get(self.authorized_client, 'posts:index'))
@@ -0,0 +1,115 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='test_title',
+            slug='test_slug',
+        )
+        cls.post = Post.objects.create(
+            text='test_post',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTest.reader)
+        self.pages = [
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+        ]
+
+    def test_not_modified(self):
+        """
+        Неизменившаяся страница отдаёт 304 без выполнения представления.
+        """
+        # Сессия и пользователь загружаются для авторизованного клиента,
+        # страница поста ещё узнаёт автора и группу.
+        for client, queries in ((self.guest_client, 0),
+                                (self.authorized_client, 2)):
+            for url in self.pages:
+                with self.subTest(url=url):
+                    etag = client.get(url)['ETag']
+                    with self.assertNumQueries(
+                            queries + (url == self.pages[0])):
+                        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code,
+                                     HTTPStatus.NOT_MODIFIED)
+                    self.assertEqual(response.content, b'')
+
+    def test_etag_depends_on_user(self):
+        url = self.pages[0]
+        self.assertNotEqual(self.guest_client.get(url)['ETag'],
+                            self.authorized_client.get(url)['ETag'])
+
+    def test_changes_reset_etag(self):
+        """
+        Пост, комментарий и подписка меняют ETag страниц,
+        которые от них зависят.
+        """
+        detail, profile, group = self.pages
+        changes = (
+            (lambda: Comment.objects.create(post=self.post,
+                                            author=self.reader,
+                                            text='comment'), [detail]),
+            (lambda: Follow.objects.create(user=self.reader,
+                                           author=self.author),
+             [detail, profile]),
+            (lambda: Post.objects.filter(pk=self.post.pk).first().save(),
+             self.pages),
+        )
+        for change, urls in changes:
+            etags = {url: self.authorized_client.get(url)['ETag']
+                     for url in self.pages}
+            change()
+            for url in self.pages:
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                expected = (HTTPStatus.OK if url in urls
+                            else HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response.status_code, expected, url)
+
+    def test_unrelated_post_keeps_etag(self):
+        """
+        Новый пост другого автора вне группы не меняет ETag профиля
+        и страницы поста.
+        """
+        other = User.objects.create_user(username='other')
+        detail, profile, _ = self.pages
+        for client in (self.guest_client, self.authorized_client):
+            etags = {url: client.get(url)['ETag'] for url in (detail, profile)}
+            Post.objects.create(text='unrelated', author=other)
+            for url, etag in etags.items():
+                with self.subTest(url=url):
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code,
+                                     HTTPStatus.NOT_MODIFIED)
+
+    def test_version_counter(self):
+        """
+        Версия поста растёт при правке поста и его комментариев.
+        """
+        comment = Comment.objects.create(post=self.post, author=self.reader,
+                                         text='comment')
+        comment.text = 'edited'
+        comment.save()
+        comment.delete()
+        self.post.refresh_from_db()
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 5)
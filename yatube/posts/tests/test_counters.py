@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from likes.models import PostLike
+from posts.models import Follow, Post, Comment, User
+from posts.stats import author_stats
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.post = Post.objects.create(text='test_text', author=self.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_comment_counter(self):
+        """
+        Счётчик комментариев меняется при добавлении и удалении.
+        """
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'test_comment'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        Comment.objects.get(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_like_counter(self):
+        """
+        Счётчик лайков меняется при добавлении и удалении.
+        """
+        self.authorized_client.post(
+            reverse('likes:add'),
+            data={'post_id': self.post.id,
+                  'user_id': self.reader.id,
+                  'url_from': '/'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        like = PostLike.objects.get(post=self.post, user=self.reader)
+        self.authorized_client.post(
+            reverse('likes:remove'),
+            data={'post_likes_id': like.id, 'url_from': '/'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_cascade_delete_updates_counters(self):
+        """
+        Каскадное удаление пользователя уменьшает счётчики поста.
+        """
+        user = User.objects.create_user(username='leaving_user')
+        Comment.objects.create(post=self.post, author=user, text='text')
+        PostLike.objects.create(post=self.post, user=user, is_like=True)
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.likes_count, self.post.comments_count), (1, 1))
+        user.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.likes_count, self.post.comments_count), (0, 0))
+
+    def test_recount_counters_command(self):
+        """
+        Команда recount_counters исправляет разошедшиеся счётчики.
+        """
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='text')
+        PostLike.objects.create(post=self.post, user=self.reader,
+                                is_like=True)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7,
+                                                    comments_count=0)
+        out = StringIO()
+        call_command('recount_counters', stdout=out)
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.likes_count, self.post.comments_count), (1, 1))
+        self.assertIn('1', out.getvalue())
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stats_are_cached(self):
+        """
+        Повторное чтение счётчиков не обращается к базе.
+        """
+        Post.objects.create(text='test_text', author=self.author)
+        self.assertEqual(author_stats(self.author.pk),
+                         {'posts': 1, 'followers': 0, 'following': 0})
+        with self.assertNumQueries(0):
+            author_stats(self.author.pk)
+
+    def test_signals_reset_stats(self):
+        """
+        Посты и подписки меняют закэшированные счётчики.
+        """
+        author_stats(self.author.pk)
+        author_stats(self.reader.pk)
+        post = Post.objects.create(text='test_text', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(author_stats(self.author.pk),
+                         {'posts': 1, 'followers': 1, 'following': 0})
+        self.assertEqual(author_stats(self.reader.pk),
+                         {'posts': 0, 'followers': 0, 'following': 1})
+        post.delete()
+        follow.delete()
+        self.assertEqual(author_stats(self.author.pk),
+                         {'posts': 0, 'followers': 0, 'following': 0})
+        self.assertEqual(author_stats(self.reader.pk)['following'], 0)
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, User
+
+LONG_TEXT = ' '.join(f'слово{index}' for index in range(50))
+
+
+class ExcerptTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user')
+        cls.long = Post.objects.create(text=LONG_TEXT, author=cls.user)
+        cls.short = Post.objects.create(text='короткий <b>пост</b>',
+                                        author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_excerpt_saved(self):
+        """
+        Начало текста считается при сохранении.
+        """
+        self.assertEqual(len(self.long.excerpt.split()), settings.QTY_WORDS)
+        self.assertTrue(self.long.has_more_text)
+        self.assertEqual(self.short.excerpt, self.short.text)
+        self.assertFalse(self.short.has_more_text)
+        post = Post.objects.get(pk=self.short.pk)
+        post.text = LONG_TEXT
+        post.save()
+        self.assertTrue(Post.objects.get(pk=post.pk).has_more_text)
+
+    def test_lists_do_not_load_text(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth_user'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertNotContains(response, 'слово49')
+                self.assertContains(
+                    response,
+                    reverse('posts:post_text',
+                            kwargs={'post_id': self.long.id}))
+                self.assertFalse(any('"posts_post"."text"' in query['sql']
+                                     for query in queries))
+
+    def test_text_fragment(self):
+        """
+        Полный текст загружается отдельно и экранируется.
+        """
+        response = self.client.get(
+            reverse('posts:post_text', kwargs={'post_id': self.long.id}))
+        self.assertContains(response, 'слово49')
+        response = self.client.get(
+            reverse('posts:post_text', kwargs={'post_id': self.short.id}))
+        self.assertEqual(response.content.decode(),
+                         'короткий &lt;b&gt;пост&lt;/b&gt;')
+        response = self.client.get(
+            reverse('posts:post_text', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
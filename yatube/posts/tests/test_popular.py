@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from likes.models import PostLike
+from posts import popular
+from posts.models import Comment, Post, User
+
+
+@override_settings(HOT_SCORE_HALF_LIFE=timedelta(hours=12),
+                   HOT_SCORE_WINDOW=timedelta(days=3),
+                   HOT_SCORE_BUCKET=timedelta(hours=1),
+                   HOT_SCORE_LIKE_WEIGHT=1,
+                   HOT_SCORE_COMMENT_WEIGHT=3)
+class PopularTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.users = [User.objects.create_user(username=f'user_{index}')
+                     for index in range(3)]
+        cls.fresh = Post.objects.create(text='fresh', author=cls.author)
+        cls.old = Post.objects.create(text='old', author=cls.author)
+        cls.quiet = Post.objects.create(text='quiet', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def like(self, post, user, age):
+        PostLike.objects.create(post=post, user=user, is_like=True,
+                                like_date=self.now - age)
+
+    def test_scores_decay(self):
+        """
+        Вес лайка убывает вдвое за период полураспада,
+        события вне окна не учитываются.
+        """
+        self.like(self.fresh, self.users[0], timedelta(minutes=30))
+        self.like(self.old, self.users[0], timedelta(hours=12, minutes=30))
+        self.like(self.quiet, self.users[0], timedelta(days=4))
+        scores = popular.compute_scores(self.now)
+        self.assertNotIn(self.quiet.id, scores)
+        self.assertAlmostEqual(scores[self.fresh.id] / scores[self.old.id],
+                               2, places=6)
+
+    def test_comments_weigh_more(self):
+        self.like(self.fresh, self.users[0], timedelta(minutes=30))
+        self.like(self.fresh, self.users[1], timedelta(minutes=30))
+        Comment.objects.create(post=self.old, author=self.users[0],
+                               text='comment')
+        scores = popular.compute_scores()
+        self.assertGreater(scores[self.old.id], scores[self.fresh.id])
+
+    def test_update_scores(self):
+        """
+        Пересчёт обнуляет оценки постов без активности в окне.
+        """
+        Post.objects.filter(pk=self.quiet.pk).update(hot_score=5)
+        self.like(self.fresh, self.users[0], timedelta(minutes=30))
+        out = StringIO()
+        call_command('update_hot_scores', stdout=out)
+        self.assertIn('Популярных постов: 1', out.getvalue())
+        self.assertEqual(
+            list(Post.objects.filter(hot_score__gt=0)), [self.fresh])
+
+    def test_popular_feeds(self):
+        """
+        Лента популярных на сайте и в API упорядочена по оценке.
+        """
+        for user in self.users:
+            self.like(self.old, user, timedelta(minutes=30))
+        self.like(self.fresh, self.users[0], timedelta(minutes=30))
+        popular.update_scores(self.now)
+        response = Client().get(reverse('posts:popular'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.old, self.fresh])
+        self.assertContains(response, reverse('posts:popular'))
+        response = APIClient().get('/api/v1/posts/popular/',
+                                   {'expand': 'hot_score'})
+        results = response.data['results']
+        self.assertEqual([item['id'] for item in results],
+                         [self.old.id, self.fresh.id])
+        self.assertGreater(results[0]['hot_score'], 0)
@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from likes.models import PostLike
+from posts.models import Post, Group, User, Comment, Follow
+
+
+class QueryCountTest(TestCase):
+    """
+    Число запросов страниц с холодным кэшем не зависит от числа
+    постов на странице. При изменении числа запросов обновите
+    QUERIES осознанно.
+    """
+    QUERIES = {
+        'posts:index': 4,
+        'posts:group_list': 5,
+        'posts:profile': 9,
+        'posts:post_detail': 6,
+        'posts:follow_index': 6,
+        'api:posts': 1,
+        'api:comments': 2,
+        'api:follow': 1,
+        'api:groups': 1,
+        'api:likes': 1,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='title', slug='slug')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = cls.create_post()
+
+    @classmethod
+    def create_post(cls):
+        post = Post.objects.create(text='text', author=cls.author,
+                                   group=cls.group)
+        Comment.objects.create(post=post, author=cls.user, text='text')
+        PostLike.objects.create(post=post, user=cls.user, is_like=True)
+        return post
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.user)
+
+    def urls(self):
+        return {
+            'posts:index': (self.authorized_client,
+                            reverse('posts:index')),
+            'posts:group_list': (self.authorized_client,
+                                 reverse('posts:group_list',
+                                         kwargs={'slug': self.group.slug})),
+            'posts:profile': (self.authorized_client,
+                              reverse('posts:profile',
+                                      kwargs={'username':
+                                              self.author.username})),
+            'posts:post_detail': (self.authorized_client,
+                                  reverse('posts:post_detail',
+                                          kwargs={'post_id': self.post.id})),
+            'posts:follow_index': (self.authorized_client,
+                                   reverse('posts:follow_index')),
+            'api:posts': (self.api_client, '/api/v1/posts/'),
+            'api:comments': (self.api_client,
+                             f'/api/v1/posts/{self.post.id}/comments/'),
+            'api:follow': (self.api_client, '/api/v1/follow/'),
+            'api:groups': (self.api_client, '/api/v1/groups/'),
+            'api:likes': (self.api_client, '/api/v1/likes/'),
+        }
+
+    def assert_query_counts(self):
+        for name, (client, url) in self.urls().items():
+            with self.subTest(name=name):
+                cache.clear()
+                with self.assertNumQueries(self.QUERIES[name]):
+                    client.get(url)
+
+    def test_query_counts_are_pinned(self):
+        """
+        Число запросов страниц совпадает с закреплённым.
+        """
+        self.assert_query_counts()
+
+    def test_query_counts_do_not_grow_with_posts(self):
+        """
+        Число запросов не растёт с числом постов и комментариев.
+        """
+        for _ in range(12):
+            self.create_post()
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='text')
+        self.assert_query_counts()
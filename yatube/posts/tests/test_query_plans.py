@@ -0,0 +1,82 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from likes.models import PostLike
+from posts.models import Post, Group, User, Comment, Follow
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='title', slug='slug')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(30):
+            cls.post = Post.objects.create(text=f'text {i}',
+                                           author=cls.author,
+                                           group=cls.group)
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text='text')
+            PostLike.objects.create(post=cls.post, user=cls.user,
+                                    is_like=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def query_plans(self, url):
+        """
+        Планы запросов второй страницы url.
+        """
+        page_obj = self.authorized_client.get(url).context.get('page_obj')
+        data = {'cursor': page_obj.next_cursor} if page_obj else {}
+        with CaptureQueriesContext(connection) as context:
+            self.authorized_client.get(url, data)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append([row[-1] for row in cursor.fetchall()])
+        return plans
+
+    def test_views_use_indexes(self):
+        """
+        Запросы страниц читают индексы без полного просмотра таблиц
+        и без сортировки во временном B-дереве.
+        """
+        views_indexes = {
+            reverse('posts:index'): (
+                'posts_post USING INDEX post_pub_date_idx',
+                'likes_postlike USING INDEX sqlite_autoindex_likes_postlike',
+            ),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): (
+                'posts_post USING INDEX post_group_pub_date_idx',
+            ),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): (
+                'posts_post USING INDEX post_author_pub_date_idx',
+                'posts_follow USING COVERING INDEX '
+                'sqlite_autoindex_posts_follow_1 (user_id=? AND author_id=?)',
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}): (
+                'posts_comment USING INDEX comment_post_created_idx',
+            ),
+            reverse('posts:follow_index'): (
+                'posts_timelineentry USING INDEX timeline_user_pub_date_idx',
+            ),
+        }
+        for url, indexes in views_indexes.items():
+            with self.subTest(url=url):
+                plans = self.query_plans(url)
+                details = '\n'.join(sum(plans, []))
+                for index in indexes:
+                    self.assertIn(index, details)
+                self.assertNotIn('TEMP B-TREE', details)
+                self.assertNotIn('SCAN ', details)
@@ -0,0 +1,121 @@
+import multiprocessing
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from posts.cache import bump, get_versions
+
+TEMP_CACHE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+COMMANDS = {
+    'versions': get_versions,
+    'bump': bump,
+    'get': lambda *args: cache.get(*args),
+    'set': lambda *args: cache.set(*args),
+    'incr': lambda key, times: [cache.incr(key) for _ in range(times)][-1],
+}
+
+
+def cache_worker(conn):
+    """
+    Процесс-воркер: выполняет команды кэша, присланные по каналу.
+    """
+    for name, args in iter(conn.recv, None):
+        conn.send(COMMANDS[name](*args))
+
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(),
+                     'нужен запуск процессов через fork')
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'core.cache.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    }
+})
+class SharedCacheTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        context = multiprocessing.get_context('fork')
+        self.workers = []
+        for _ in range(2):
+            conn, worker_conn = context.Pipe()
+            process = context.Process(target=cache_worker,
+                                      args=(worker_conn,))
+            process.start()
+            self.workers.append((process, conn))
+
+    def tearDown(self):
+        for process, conn in self.workers:
+            conn.send(None)
+            process.join(5)
+
+    def call(self, worker, name, *args):
+        conn = self.workers[worker][1]
+        conn.send((name, args))
+        return conn.recv()
+
+    def test_versions_are_shared(self):
+        """
+        Воркеры получают одну и ту же версию области.
+        """
+        first = self.call(0, 'versions', 'index', 'group:slug')
+        second = self.call(1, 'versions', 'index', 'group:slug')
+        self.assertEqual(first, second)
+
+    def test_concurrent_version_creation(self):
+        """
+        Одновременное создание версии даёт одно значение.
+        """
+        for _, conn in self.workers:
+            conn.send(('versions', ('profile:author',)))
+        first, second = [conn.recv() for _, conn in self.workers]
+        self.assertEqual(first, second)
+
+    def test_bump_is_seen_by_other_worker(self):
+        """
+        Сброс в одном воркере меняет версию во втором,
+        и закэшированная страница больше не используется.
+        """
+        version = self.call(0, 'versions', 'index')['index']
+        self.call(0, 'set', f'page:{version}', 'cached page')
+        self.assertEqual(self.call(1, 'get', f'page:{version}'),
+                         'cached page')
+        self.call(1, 'bump', 'index')
+        new_version = self.call(0, 'versions', 'index')['index']
+        self.assertNotEqual(version, new_version)
+        self.assertIsNone(self.call(0, 'get', f'page:{new_version}'))
+
+    def test_parent_sees_worker_bump(self):
+        """
+        Версия ленты в процессе сервера совпадает с воркерами.
+        """
+        before = get_versions('index')['index']
+        self.call(1, 'bump', 'index')
+        self.assertNotEqual(before, get_versions('index')['index'])
+        self.assertEqual(get_versions('index'),
+                         self.call(0, 'versions', 'index'))
+
+    def test_concurrent_incr(self):
+        """
+        Одновременные incr из разных процессов не теряются,
+        срок жизни записи сохраняется.
+        """
+        cache.set('counter', 0, None)
+        for _, conn in self.workers:
+            conn.send(('incr', ('counter', 200)))
+        for _, conn in self.workers:
+            conn.recv()
+        self.assertEqual(cache.get('counter'), 400)
+        self.assertEqual(cache.decr('counter', 400), 0)
+        with open(cache._key_to_file('counter'), 'rb') as f:
+            self.assertIsNone(pickle.load(f))
@@ -0,0 +1,167 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.cache import get_versions, post_scope, profile_scope
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_THUMBNAIL_WORKERS=0)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ThumbnailTest.user)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            text='test_post',
+            author=self.user,
+            image=SimpleUploadedFile(name=name, content=SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+
+    def test_template_falls_back_to_original(self):
+        """
+        Пока превью нет, шаблон выводит исходное изображение
+        и не создаёт превью в процессе запроса.
+        """
+        post = self.create_post()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+        self.assertIsNone(thumbnails.get_url(post.image))
+
+    def test_thumbnail_generated_after_commit(self):
+        """
+        Сохранение поста создаёт превью после фиксации транзакции.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post()
+        url = thumbnails.get_url(post.image)
+        self.assertIsNotNone(url)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertContains(response, url)
+        self.assertNotContains(response, post.image.url)
+
+    def test_thumbnail_resets_only_its_posts(self):
+        """
+        Готовое превью сбрасывает страницы своего поста и автора,
+        но не ленту.
+        """
+        post = self.create_post()
+        scopes = ('index', post_scope(post.id),
+                  profile_scope(self.user.username))
+        before = get_versions(*scopes)
+        thumbnails.run(post.image.name)
+        after = get_versions(*scopes)
+        self.assertEqual(before['index'], after['index'])
+        for scope in scopes[1:]:
+            self.assertNotEqual(before[scope], after[scope])
+
+    def test_form_upload_enqueues_thumbnail(self):
+        """
+        Пост, созданный через форму, получает превью.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(reverse('posts:post_create'), data={
+                'text': 'form_post',
+                'image': SimpleUploadedFile(name='form.gif',
+                                            content=SMALL_GIF,
+                                            content_type='image/gif'),
+            })
+        post = Post.objects.get(text='form_post')
+        self.assertIsNotNone(thumbnails.get_url(post.image))
+
+    def test_backfill_command(self):
+        """
+        Команда создаёт только недостающие превью.
+        """
+        first = self.create_post('first.gif')
+        self.create_post('second.gif')
+        thumbnails.generate(first.image.name)
+        out = StringIO()
+        call_command('generate_thumbnails', workers=0, stdout=out)
+        self.assertIn('Изображений: 2, создано превью: 1', out.getvalue())
+
+    def test_bulk_lookup(self):
+        """
+        Адреса превью страницы загружаются одним запросом,
+        повторно — из кэша.
+        """
+        posts = [self.create_post(f'bulk_{index}.gif') for index in range(3)]
+        for post in posts[:2]:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        with self.assertNumQueries(1):
+            urls = thumbnails.get_urls([post.image for post in posts])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                urls, thumbnails.get_urls([post.image for post in posts]))
+        self.assertIsNotNone(urls[posts[0].image.name])
+        self.assertIsNone(urls[posts[2].image.name])
+
+    def test_index_kvstore_queries_do_not_grow(self):
+        """
+        Число запросов к хранилищу превью на странице
+        не зависит от числа постов.
+        """
+        def kvstore_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(reverse('posts:index'))
+            return len([query for query in queries
+                        if 'thumbnail_kvstore' in query['sql']])
+
+        self.create_post('first.gif')
+        one_post = kvstore_queries()
+        for index in range(5):
+            self.create_post(f'more_{index}.gif')
+        self.assertEqual(one_post, kvstore_queries())
+
+    def test_warm_command(self):
+        """
+        Прогрев заполняет кэш записей превью новых постов.
+        """
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        thumbnails.generate(first.image.name)
+        cache.clear()
+        out = StringIO()
+        call_command('warm_thumbnails', count=10, stdout=out)
+        self.assertIn('Изображений: 2, в кэше: 1, создано превью: 1',
+                      out.getvalue())
+        with self.assertNumQueries(0):
+            urls = thumbnails.get_urls([first.image, second.image])
+        self.assertTrue(all(urls.values()))
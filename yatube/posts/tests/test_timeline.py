@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User, Follow, TimelineEntry
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other_reader = User.objects.create_user(username='other_reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_is_pushed_to_followers(self):
+        """
+        Новый пост попадает в ленты подписчиков при публикации.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='text', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.other_reader, post=post).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """
+        Подписка дописывает старые посты автора, отписка их удаляет.
+        """
+        posts = [Post.objects.create(text=f'text {i}', author=self.author)
+                 for i in range(3)]
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': self.author.username}))
+        self.assertEqual(self.feed(), posts[::-1])
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': self.author.username}))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_open(self):
+        """
+        Посты популярного автора не раскладываются при публикации,
+        а читаются при открытии ленты без записи в базу.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other_reader, author=self.author)
+        post = Post.objects.create(text='text', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post])
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1, POSTS_ON_PAGE=2)
+    def test_popular_author_posts_are_merged(self):
+        """
+        Посты популярного автора и записи ленты идут вместе
+        по дате на всех страницах обоих пагинаторов.
+        """
+        other_author = User.objects.create_user(username='other_author')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other_reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=other_author)
+        posts = [Post.objects.create(
+            text=f'text {i}',
+            author=self.author if i % 2 else other_author)
+            for i in range(5)][::-1]
+        pages = []
+        url = reverse('posts:follow_index')
+        while url:
+            page = self.client.get(url).context['page_obj']
+            pages += list(page)
+            url = (f'{reverse("posts:follow_index")}'
+                   f'?cursor={page.next_cursor}'
+                   if page.next_cursor else None)
+        self.assertEqual(pages, posts)
+        pages = []
+        for number in (1, 2, 3):
+            response = self.client.get(reverse('posts:follow_index'),
+                                       {'page': number})
+            pages += list(response.context['page_obj'])
+        self.assertEqual(pages, posts)
+
+    def test_rebuild_timelines_command(self):
+        """
+        Команда rebuild_timelines восстанавливает ленты.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='text', author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), [post])
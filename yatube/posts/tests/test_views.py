@@ -6,6 +6,8 @@ from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django import forms
 from http import HTTPStatus
 
@@ -45,6 +47,7 @@ class PostViewTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PostViewTest.user)
 
@@ -220,21 +223,22 @@ class PostViewTest(TestCase):
 
     def test_cache_index(self):
         """
-        Проверка кэширования страницы index.
+        Страница index кэшируется для анонимных пользователей
+        и сбрасывается при создании поста.
         """
-        before_create_post = self.authorized_client.get(
-            reverse('posts:index'))
-        first_item_before = before_create_post.content
+        guest_client = Client()
+        before_update = guest_client.get(reverse('posts:index')).content
+        Post.objects.filter(pk=self.post.pk).update(
+            text='test_cache_update', excerpt='test_cache_update')
+        after_update = guest_client.get(reverse('posts:index')).content
+        self.assertEqual(before_update, after_update)
         Post.objects.create(
             text='test_cache',
             author=self.user,
             group=self.group)
-        after_create_post = self.authorized_client.get(reverse('posts:index'))
-        first_item_after = after_create_post.content
-        self.assertEqual(first_item_before, first_item_after)
-        cache.clear()
-        after_clear = self.authorized_client.get(reverse('posts:index'))
-        self.assertNotEqual(first_item_after, after_clear)
+        after_create_post = guest_client.get(reverse('posts:index')).content
+        self.assertNotEqual(after_update, after_create_post)
+        self.assertIn('test_cache_update', after_create_post.decode())
 
     def test_page_404(self):
         """
@@ -266,6 +270,7 @@ class PaginatorViewsTest(TestCase):
         Post.objects.bulk_create(cls.posts)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -319,6 +324,43 @@ class PaginatorViewsTest(TestCase):
                 settings.QTY_POSTS - settings.POSTS_ON_PAGE
             )
 
+    def test_cursor_pages_cover_all_posts(self):
+        """
+        Курсорный пагинатор проходит все посты вперёд и назад.
+        """
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        second_page = self.client.get(
+            url, {'cursor': first_page.next_cursor}).context['page_obj']
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            len(second_page.object_list),
+            settings.QTY_POSTS - settings.POSTS_ON_PAGE
+        )
+        self.assertEqual(
+            [post.id for post in [*first_page, *second_page]],
+            list(Post.objects.order_by('-pub_date', '-id')
+                 .values_list('id', flat=True))
+        )
+        previous_page = self.client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+
+    def test_cursor_page_does_not_count(self):
+        """
+        Курсорная страница не выполняет COUNT(*).
+        """
+        first_page = self.client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('posts:index'),
+                            {'cursor': first_page.context['page_obj']
+                             .next_cursor})
+        self.assertFalse([query for query in context.captured_queries
+                          if 'COUNT(' in query['sql']])
+
 
 class FollowViewTest(TestCase):
     @classmethod
@@ -333,6 +375,7 @@ class FollowViewTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.first_authorized_client = Client()
         self.first_authorized_client.force_login(FollowViewTest.first_user)
         self.second_authorized_client = Client()
@@ -407,8 +450,8 @@ class FollowViewTest(TestCase):
         new_post_follower = Post.objects.create(
             author=self.first_user,
             text='other_test_text')
-        Follow.objects.create(user=self.second_user,
-                              author=self.author)
+        Follow.objects.get_or_create(user=self.second_user,
+                                     author=self.author)
         response = self.second_authorized_client.get(
             reverse('posts:follow_index'))
         new_post_unfollower = response.context['page_obj']
@@ -0,0 +1,204 @@
+"""
+Превью изображений постов.
+
+Превью создаются заранее: после сохранения поста задача уходит
+в пул фоновых потоков, а шаблоны выводят готовое превью или,
+пока его нет, исходное изображение.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import metrics
+from .cache import bump, group_scope, post_scope, profile_scope
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Сколько имён изображений передаётся в один запрос к базе.
+BUMP_BATCH_SIZE = 500
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    """
+    Бэкенд sorl, который умеет назвать файл превью,
+    не открывая исходное изображение.
+    """
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(thumbnail_defaults, attr):
+                options.setdefault(key, value)
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = PostThumbnailBackend()
+
+
+def thumbnail_file(image):
+    return backend.get_thumbnail_file(image,
+                                      settings.POST_THUMBNAIL_GEOMETRY,
+                                      **settings.POST_THUMBNAIL_OPTIONS)
+
+
+def get_url(image):
+    """
+    Адрес готового превью или None, если превью ещё не создано.
+    """
+    thumbnail = default.kvstore.get(thumbnail_file(image))
+    return thumbnail.url if thumbnail else None
+
+
+def get_urls(images):
+    """
+    Адреса готовых превью набора изображений: одно обращение к кэшу
+    и не больше одного запроса к базе. Возвращает словарь
+    {имя изображения: адрес превью или None}.
+    """
+    names = {getattr(image, 'name', image) for image in images if image}
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        return {name: get_url(name) for name in names}
+    keys = {add_prefix(thumbnail_file(name).key): name for name in names}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects
+                     .filter(key__in=missing)
+                     .values_list('key', 'value'))
+        # Как и KVStore, запоминаем отсутствие записи, чтобы
+        # не повторять запрос к базе.
+        kvstore.cache.set_many(
+            {key: found.get(key, EMPTY_VALUE) for key in missing},
+            thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(found)
+    urls = {}
+    for key, name in keys.items():
+        value = values.get(key)
+        urls[name] = (deserialize_image_file(value).url
+                      if value and value != EMPTY_VALUE else None)
+    return urls
+
+
+def attach_urls(posts):
+    """
+    Сохраняет адреса превью страницы постов в атрибуте thumbnail_url.
+    """
+    posts = list(posts)
+    urls = get_urls([post.image for post in posts])
+    for post in posts:
+        post.thumbnail_url = urls.get(post.image.name) if post.image else None
+    return posts
+
+
+def generate(name):
+    """
+    Создаёт превью изображения. Возвращает True,
+    если превью не было и оно создано.
+    """
+    if get_url(name):
+        return False
+    with metrics.timer('yatube_thumbnail_generation_seconds'):
+        get_thumbnail(name, settings.POST_THUMBNAIL_GEOMETRY,
+                      **settings.POST_THUMBNAIL_OPTIONS)
+    return True
+
+
+def try_generate(name):
+    """
+    generate, который записывает ошибку в журнал вместо исключения:
+    испорченное изображение не должно останавливать очередь.
+    """
+    try:
+        return generate(name)
+    except Exception:
+        logger.exception('Не удалось создать превью %s', name)
+        return False
+
+
+def bump_posts(names):
+    """
+    Сбрасывает страницы и фрагменты постов с изображениями names:
+    они ссылаются на исходное изображение. Сбрасываются только
+    области постов, их авторов и групп; ленты получат превью, когда
+    истечёт кэш страницы или в них появится новый пост.
+    """
+    names = list(names)
+    scopes = set()
+    for start in range(0, len(names), BUMP_BATCH_SIZE):
+        rows = (Post.objects
+                .filter(image__in=names[start:start + BUMP_BATCH_SIZE])
+                .values_list('pk', 'author__username', 'group__slug'))
+        for pk, username, slug in rows:
+            scopes.update((post_scope(pk), profile_scope(username),
+                           group_scope(slug)))
+    bump(*scopes)
+
+
+def run(name):
+    try:
+        if try_generate(name):
+            bump_posts([name])
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def run_in_thread(name):
+    try:
+        run(name)
+    finally:
+        # У каждого потока пула своё соединение с базой.
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POST_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def enqueue(name):
+    """
+    Ставит создание превью в очередь. Повторные задачи
+    для изображения, которое уже обрабатывается, отбрасываются.
+    """
+    if not settings.POST_THUMBNAIL_WORKERS:
+        run(name)
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    get_executor().submit(run_in_thread, name)
+
+
+def enqueue_on_commit(name):
+    transaction.on_commit(lambda: enqueue(name))
@@ -0,0 +1,229 @@
+"""
+Лента подписок, материализованная в таблице TimelineEntry.
+
+Новые посты раскладываются по лентам подписчиков при публикации
+(fan-out on write). Посты авторов, у которых подписчиков больше
+settings.TIMELINE_FANOUT_LIMIT, при публикации не раскладываются:
+лента читает их из Post по индексу (author, -pub_date, -id)
+и сливает с записями TimelineEntry (fan-out on read). Чтение ленты
+ничего не пишет в базу.
+"""
+from copy import copy
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+from .models import Follow, Post, TimelineEntry
+
+FOLLOWERS_KEY = 'timeline:followers:{}'
+
+
+def followers_count_many(author_ids):
+    """
+    Количество подписчиков авторов. Значения берутся из кэша,
+    недостающие считаются одним запросом.
+    """
+    keys = {FOLLOWERS_KEY.format(author_id): author_id
+            for author_id in author_ids}
+    counts = {keys[key]: value
+              for key, value in cache.get_many(keys).items()}
+    missing = [author_id for author_id in author_ids
+               if author_id not in counts]
+    if missing:
+        fetched = dict.fromkeys(missing, 0)
+        fetched.update(Follow.objects
+                       .filter(author_id__in=missing)
+                       .values_list('author_id')
+                       .annotate(count=Count('id'))
+                       .order_by())
+        cache.set_many(
+            {FOLLOWERS_KEY.format(author_id): count
+             for author_id, count in fetched.items()},
+            settings.TIMELINE_CACHE_TIMEOUT
+        )
+        counts.update(fetched)
+    return counts
+
+
+def refresh_followers_count(author_id):
+    count = Follow.objects.filter(author_id=author_id).count()
+    cache.set(FOLLOWERS_KEY.format(author_id), count,
+              settings.TIMELINE_CACHE_TIMEOUT)
+    return count
+
+
+def is_celebrity(followers):
+    return followers > settings.TIMELINE_FANOUT_LIMIT
+
+
+def entries_for(user_id, posts):
+    return [TimelineEntry(user_id=user_id,
+                          post_id=post_id,
+                          author_id=author_id,
+                          pub_date=pub_date)
+            for post_id, author_id, pub_date in posts]
+
+
+def save_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """
+    Добавляет новый пост в ленты подписчиков автора.
+    """
+    followers = followers_count_many([post.author_id])[post.author_id]
+    if is_celebrity(followers):
+        return
+    user_ids = (Follow.objects
+                .filter(author_id=post.author_id)
+                .values_list('user_id', flat=True))
+    save_entries([
+        TimelineEntry(user_id=user_id,
+                      post_id=post.id,
+                      author_id=post.author_id,
+                      pub_date=post.pub_date)
+        for user_id in user_ids.iterator()
+    ])
+
+
+def sync(user_id, author_id):
+    """
+    Дописывает в ленту пользователя посты автора,
+    опубликованные после последней записи ленты.
+    """
+    last = (TimelineEntry.objects
+            .filter(user_id=user_id, author_id=author_id)
+            .aggregate(last=Max('pub_date'))['last'])
+    posts = Post.objects.filter(author_id=author_id)
+    if last is not None:
+        posts = posts.filter(pub_date__gte=last)
+    save_entries(entries_for(
+        user_id,
+        posts.values_list('id', 'author_id', 'pub_date').iterator()
+    ))
+
+
+def follow(user_id, author_id):
+    """
+    Заполняет ленту постами нового автора.
+    """
+    refresh_followers_count(author_id)
+    sync(user_id, author_id)
+
+
+def unfollow(user_id, author_id):
+    """
+    Удаляет посты автора из ленты. Если автор перестал быть
+    популярным, ленты оставшихся подписчиков догоняются сразу.
+    """
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 author_id=author_id).delete()
+    followers = refresh_followers_count(author_id)
+    if followers == settings.TIMELINE_FANOUT_LIMIT:
+        for follower_id in (Follow.objects
+                            .filter(author_id=author_id)
+                            .values_list('user_id', flat=True)):
+            sync(follower_id, author_id)
+
+
+def renamed(condition, names):
+    """
+    Копия условия Q, в которой поля переименованы по names.
+    """
+    def rename(lookup):
+        field, separator, rest = lookup.partition('__')
+        return names.get(field, field) + separator + rest
+
+    condition = copy(condition)
+    condition.children = [
+        renamed(child, names) if isinstance(child, Q)
+        else (rename(child[0]), child[1])
+        for child in condition.children
+    ]
+    return condition
+
+
+class Feed:
+    """
+    Упорядоченное объединение наборов постов для пагинаторов:
+    поддерживает filter, order_by, срезы и count. Источник — тройка
+    (queryset, переименования полей Post, функция получения поста).
+    Каждый источник читается своим запросом с тем же условием
+    и ограничением, строки сливаются по ключу сортировки.
+    """
+    model = Post
+    ordered = True
+
+    def __init__(self, sources, ordering=('-pub_date', '-id')):
+        self.sources = sources
+        self.ordering = ordering
+
+    def filter(self, condition):
+        return Feed([(queryset.filter(renamed(condition, names)),
+                      names, get_post)
+                     for queryset, names, get_post in self.sources],
+                    self.ordering)
+
+    def order_by(self, *ordering):
+        return Feed(self.sources, ordering)
+
+    def count(self):
+        return sum(queryset.count() for queryset, _, _ in self.sources)
+
+    def source_ordering(self, names):
+        ordering = []
+        for name in self.ordering:
+            field = name.lstrip('-')
+            ordering.append(name[:len(name) - len(field)]
+                            + names.get(field, field))
+        return ordering
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.stop is None:
+            raise TypeError('Ленту можно только срезать с концом.')
+        posts = []
+        for queryset, names, get_post in self.sources:
+            rows = queryset.order_by(
+                *self.source_ordering(names))[:index.stop]
+            posts += map(get_post, rows) if get_post else rows
+        fields = [name.lstrip('-') for name in self.ordering]
+        posts.sort(key=lambda post: [getattr(post, field)
+                                     for field in fields],
+                   reverse=self.ordering[0].startswith('-'))
+        return posts[index]
+
+
+def feed(user):
+    """
+    Лента пользователя: записи TimelineEntry по индексу
+    (user, -pub_date, -post) и посты популярных авторов,
+    каждый автор — своим запросом по индексу автора.
+    """
+    author_ids = list(Follow.objects
+                      .filter(user=user)
+                      .values_list('author_id', flat=True))
+    celebrities = sorted(
+        author_id for author_id, followers
+        in followers_count_many(author_ids).items()
+        if is_celebrity(followers)
+    )
+    entries = (TimelineEntry.objects
+               .filter(user=user)
+               .select_related('post__author', 'post__group')
+               .defer('post__text'))
+    if celebrities:
+        # Записи, оставшиеся с тех пор, когда автор не был популярным.
+        entries = entries.exclude(author_id__in=celebrities)
+    sources = [(entries, {'id': 'post_id'}, lambda entry: entry.post)]
+    for author_id in celebrities:
+        sources.append((Post.objects
+                        .filter(author_id=author_id)
+                        .select_related('author', 'group')
+                        .defer('text'), {}, None))
+    return Feed(sources)
@@ -1,39 +1,90 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import HttpResponse
+from django.template.defaultfilters import linebreaksbr
+from django.db import transaction
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
 
+from likes.utils import attach_like_state
+
+from . import thumbnails, timeline
+from .cache import (COUNTERS_SCOPE, POPULAR_SCOPE, attach_versions,
+                    cache_anonymous_page, group_scope, profile_scope,
+                    post_detail_scopes, post_scope)
 from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
+from .paginators import CursorPaginator
+from .stats import author_stats, posts_count
 
 
-def page_paginator(request, obj):
+def page_paginator(request, obj, get_post=None,
+                   ordering=('-pub_date', '-id')):
     """
     Пагинатор для страниц.
+    В режиме settings.POSTS_PAGINATION = 'cursor' страницы выбираются
+    по ключу ordering (?cursor=), ссылки с ?page= обслуживаются
+    постраничным пагинатором.
+    get_post достаёт пост из элемента obj, если obj — не посты.
+    Состояние лайков и адреса превью для постов страницы
+    загружаются одним запросом, версии фрагментов постов — одним
+    обращением к кэшу.
     """
-    paginator = Paginator(obj, settings.POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if (settings.POSTS_PAGINATION == 'cursor'
+            and 'page' not in request.GET):
+        paginator = CursorPaginator(obj, settings.POSTS_ON_PAGE, ordering)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    else:
+        paginator = Paginator(obj, settings.POSTS_ON_PAGE)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+        page_obj.page_range = paginator.get_elided_page_range(
+            page_obj.number)
+    posts = page_obj.object_list
+    if get_post is not None:
+        posts = [get_post(item) for item in posts]
+    posts = attach_versions(thumbnails.attach_urls(posts))
+    page_obj.object_list = attach_like_state(posts, request.user)
     return page_obj
 
 
+@cache_anonymous_page(lambda request: ['index', COUNTERS_SCOPE])
 def index(request):
     """
     Главная страница.
     """
-    posts = Post.objects.all()
+    posts = Post.objects.select_related('author', 'group').defer('text')
     context = {
         'page_obj': page_paginator(request, posts),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_anonymous_page(
+    lambda request: ['index', COUNTERS_SCOPE, POPULAR_SCOPE])
+def popular(request):
+    """
+    Популярные посты по оценке активности.
+    """
+    posts = (Post.objects
+             .filter(hot_score__gt=0)
+             .select_related('author', 'group')
+             .defer('text')
+             .order_by('-hot_score', '-id'))
+    context = {
+        'page_obj': page_paginator(request, posts,
+                                   ordering=('-hot_score', '-id')),
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+@cache_anonymous_page(lambda request, slug: [group_scope(slug)], etag=True)
 def group_posts(request, slug):
     """
     Страница постов группы.
     """
     group = get_object_or_404(Group, slug=slug)
-    grp_posts = group.posts.all()
+    grp_posts = group.posts.select_related('author', 'group').defer('text')
     context = {
         'group': group,
         'page_obj': page_paginator(request, grp_posts),
@@ -41,38 +92,57 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_anonymous_page(
+    lambda request, username: [profile_scope(username)], etag=True)
 def profile(request, username):
     """
     Страница профайла пользователя.
     """
     profile_user = get_object_or_404(User, username=username)
-    profile_posts = profile_user.posts.all()
+    profile_posts = (profile_user.posts
+                     .select_related('author', 'group')
+                     .defer('text'))
     following = (request.user.is_authenticated
                  and Follow.objects.filter(user=request.user,
                                            author=profile_user).exists())
     context = {
         'profile': profile_user,
+        'stats': author_stats(profile_user.pk),
         'page_obj': page_paginator(request, profile_posts),
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@cache_anonymous_page(post_detail_scopes, etag=True)
 def post_detail(request, post_id):
     """
     Страница поста.
     """
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(Post.objects.select_related('author', 'group'),
+                             id=post_id)
+    comments = post.comments.select_related('author')
     comment_form = CommentForm()
     context = {
         'post': post,
+        'author_posts': posts_count(post.author_id),
         'form': comment_form,
         'comments': comments,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@cache_anonymous_page(lambda request, post_id: [post_scope(post_id)],
+                      etag=True)
+def post_text(request, post_id):
+    """
+    Полный текст поста: ленты выводят начало текста
+    и загружают остальное по запросу.
+    """
+    post = get_object_or_404(Post.objects.only('text'), id=post_id)
+    return HttpResponse(linebreaksbr(post.text, autoescape=True))
+
+
 @login_required
 def post_create(request):
     """
@@ -123,15 +193,15 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = comment_post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
     context = {
-        'page_obj': page_paginator(request, posts)
+        'page_obj': page_paginator(request, timeline.feed(request.user)),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -0,0 +1,9 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def get_backend():
+    """
+    Поисковый бэкенд из settings.SEARCH_BACKEND.
+    """
+    return import_string(settings.SEARCH_BACKEND)()
@@ -0,0 +1,73 @@
+from posts.models import Comment, Post
+from ..stemmer import stem_words
+
+
+def index_text(text):
+    """
+    Текст для индекса: основы слов через пробел.
+    """
+    return ' '.join(stem_words(text))
+
+
+def parse_query(query):
+    """
+    Основы слов запроса без повторов.
+    """
+    return list(dict.fromkeys(stem_words(query)))
+
+
+class BaseSearchBackend:
+    """
+    Поисковый индекс постов (заголовок и текст) и комментариев.
+    Индекс обновляется сигналами при сохранении и удалении,
+    поиск возвращает переданный queryset, отфильтрованный
+    и упорядоченный по релевантности.
+    """
+    def index_posts(self, posts):
+        raise NotImplementedError
+
+    def delete_posts(self, post_ids):
+        raise NotImplementedError
+
+    def index_comments(self, comments):
+        raise NotImplementedError
+
+    def delete_comments(self, comment_ids):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def optimize(self):
+        """
+        Уплотняет индекс после массовой загрузки.
+        """
+
+    def search_posts(self, queryset, query):
+        raise NotImplementedError
+
+    def search_comments(self, queryset, query):
+        raise NotImplementedError
+
+    def rebuild(self, batch_size=1000):
+        """
+        Заново строит индекс. Возвращает число постов
+        и комментариев в индексе.
+        """
+        self.clear()
+        counts = []
+        for queryset, index in (
+                (Post.objects.only('id', 'title', 'text'), self.index_posts),
+                (Comment.objects.only('id', 'text'), self.index_comments)):
+            batch = []
+            count = 0
+            for obj in queryset.order_by().iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    index(batch)
+                    count += len(batch)
+                    batch = []
+            index(batch)
+            counts.append(count + len(batch))
+        self.optimize()
+        return tuple(counts)
@@ -0,0 +1,46 @@
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+
+from .base import BaseSearchBackend, parse_query
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Поиск без индекса: каждое слово запроса (его основа) ищется
+    через icontains, результаты упорядочены по дате. Подходит для
+    баз без полнотекстового поиска и небольших данных.
+    """
+    def index_posts(self, posts):
+        pass
+
+    def delete_posts(self, post_ids):
+        pass
+
+    def index_comments(self, comments):
+        pass
+
+    def delete_comments(self, comment_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def filter(self, queryset, query, fields):
+        stems = parse_query(query)
+        if not stems:
+            return queryset.none()
+        return queryset.filter(reduce(and_, [
+            reduce(or_, [Q(**{f'{field}__icontains': stem})
+                         for field in fields])
+            for stem in stems
+        ]))
+
+    def search_posts(self, queryset, query):
+        return (self.filter(queryset, query, ('title', 'text'))
+                .order_by('-pub_date', '-id'))
+
+    def search_comments(self, queryset, query):
+        return (self.filter(queryset, query, ('text',))
+                .order_by('-created', '-id'))
@@ -0,0 +1,122 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .base import BaseSearchBackend, index_text, parse_query
+
+POST_TABLE = 'search_post'
+COMMENT_TABLE = 'search_comment'
+# Основы слов уже в нижнем регистре; remove_diacritics 0 сохраняет «й».
+TOKENIZE = "tokenize = 'unicode61 remove_diacritics 0'"
+CREATE_TABLES = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {POST_TABLE} '
+    f'USING fts5(title, text, {TOKENIZE})',
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENT_TABLE} '
+    f'USING fts5(text, {TOKENIZE})',
+)
+DROP_TABLES = (
+    f'DROP TABLE IF EXISTS {POST_TABLE}',
+    f'DROP TABLE IF EXISTS {COMMENT_TABLE}',
+)
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    Индекс в таблицах FTS5 той же базы SQLite. В индексе хранятся
+    основы слов, rowid строки равен ключу поста или комментария.
+    Поиск — одно соединение таблицы модели с таблицей индекса,
+    порядок — по bm25 (меньше — релевантнее).
+    """
+    # Веса совпадений в заголовке и в тексте поста для bm25.
+    title_weight = 10.0
+    text_weight = 1.0
+    # Строк в одном запросе: до 999 параметров, предела старых SQLite.
+    batch_size = 300
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    def execute(self, sql, params=None):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def insert(self, table, columns, rows):
+        """
+        Вставляет строки запросами INSERT на много строк, а не
+        executemany: индекс обновляется в сигналах, то есть внутри
+        запросов, а учёт SQL в django-debug-toolbar executemany
+        не поддерживает.
+        """
+        values = '({})'.format(', '.join(['%s'] * len(columns)))
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            self.execute(
+                f'INSERT INTO {table} ({", ".join(columns)}) '
+                f'VALUES {", ".join([values] * len(batch))}',
+                [value for row in batch for value in row])
+
+    def delete(self, table, ids):
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            self.execute(
+                f'DELETE FROM {table} '
+                f'WHERE rowid IN ({", ".join(["%s"] * len(batch))})',
+                batch)
+
+    def create_tables(self):
+        for sql in CREATE_TABLES:
+            self.execute(sql)
+
+    def index_posts(self, posts):
+        rows = [(post.pk, index_text(post.title), index_text(post.text))
+                for post in posts]
+        self.delete_posts([row[0] for row in rows])
+        self.insert(POST_TABLE, ('rowid', 'title', 'text'), rows)
+
+    def delete_posts(self, post_ids):
+        self.delete(POST_TABLE, list(post_ids))
+
+    def index_comments(self, comments):
+        rows = [(comment.pk, index_text(comment.text))
+                for comment in comments]
+        self.delete_comments([row[0] for row in rows])
+        self.insert(COMMENT_TABLE, ('rowid', 'text'), rows)
+
+    def delete_comments(self, comment_ids):
+        self.delete(COMMENT_TABLE, list(comment_ids))
+
+    def clear(self):
+        self.create_tables()
+        for table in (POST_TABLE, COMMENT_TABLE):
+            self.execute(f'DELETE FROM {table}')
+
+    def optimize(self):
+        for table in (POST_TABLE, COMMENT_TABLE):
+            self.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+    def match(self, query):
+        """
+        Выражение MATCH: все основы запроса, каждая — как префикс.
+        Основы состоят из букв и цифр, поэтому кавычки не экранируются.
+        """
+        return ' '.join(f'"{stem}"*' for stem in parse_query(query))
+
+    def search(self, queryset, table, query, rank):
+        match = self.match(query)
+        if not match:
+            return queryset.none()
+        model_table = queryset.model._meta.db_table
+        return queryset.extra(
+            select={'search_rank': rank},
+            tables=[table],
+            where=[f'{table}.rowid = {model_table}.id',
+                   f'{table} MATCH %s'],
+            params=[match],
+        ).order_by('search_rank', '-id')
+
+    def search_posts(self, queryset, query):
+        return self.search(
+            queryset, POST_TABLE, query,
+            f'bm25({POST_TABLE}, {self.title_weight}, {self.text_weight})')
+
+    def search_comments(self, queryset, query):
+        return self.search(queryset, COMMENT_TABLE, query,
+                           f'bm25({COMMENT_TABLE})')
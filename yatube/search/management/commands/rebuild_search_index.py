@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from search.backends import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts, comments = get_backend().rebuild(options['batch_size'])
+        self.stdout.write(
+            f'Постов в индексе: {posts}, комментариев: {comments}'
+        )
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+from search.backends.sqlite import DROP_TABLES, SQLiteFTSBackend
+
+
+def create_index(apps, schema_editor):
+    """
+    Таблицы FTS5 создаются только в SQLite и сразу заполняются
+    существующими постами и комментариями.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    backend = SQLiteFTSBackend(using=schema_editor.connection.alias)
+    backend.create_tables()
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    backend.index_posts(Post.objects.only('id', 'title', 'text').iterator())
+    backend.index_comments(Comment.objects.only('id', 'text').iterator())
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_TABLES:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_post_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
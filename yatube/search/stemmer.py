@@ -0,0 +1,137 @@
+"""
+Стеммер русского языка по алгоритму Snowball
+(https://snowballstem.org/algorithms/russian/stemmer.html).
+
+Окончания ищутся в области RV (после первой гласной), словообразующие
+суффиксы — в области R2. В каждой группе берётся самое длинное
+совпавшее окончание; окончания первой группы снимаются, только если
+перед ними стоит «а» или «я».
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+     'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+     'ая', 'яя', 'ою', 'ею'),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = (
+    (),
+    ('ся', 'сь'),
+)
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    (),
+    ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+     'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+     'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+     'ья', 'я'),
+)
+DERIVATIONAL = ('ост', 'ость')
+
+WORD_RE = re.compile(r'\w+')
+
+
+def regions(word):
+    """
+    Начала областей RV и R2.
+    """
+    rv = r2 = len(word)
+    for index, char in enumerate(word):
+        if char in VOWELS:
+            rv = index + 1
+            break
+    state = 0
+    for index in range(rv, len(word)):
+        is_vowel = word[index] in VOWELS
+        if state == 0 and not is_vowel:
+            state = 1
+        elif state == 1 and is_vowel:
+            state = 2
+        elif state == 2 and not is_vowel:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+def remove_ending(word, rv, groups):
+    """
+    Снимает самое длинное окончание из групп (после «а»/«я», обычное).
+    Возвращает слово без окончания или None.
+    """
+    found = None
+    for group, endings in enumerate(groups):
+        for ending in endings:
+            if (word.endswith(ending)
+                    and len(word) - len(ending) >= rv
+                    and (found is None or len(ending) > len(found[1]))):
+                found = (group, ending)
+    if found is None:
+        return None
+    group, ending = found
+    stem = word[:-len(ending)]
+    if group == 0 and not (len(stem) > rv and stem[-1] in 'ая'):
+        return None
+    return stem
+
+
+# Словарь текстов невелик по сравнению с числом слов в них, поэтому
+# основы запоминаются: повторная индексация не считает их заново.
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = regions(word)
+    # Шаг 1.
+    stemmed = remove_ending(word, rv, PERFECTIVE_GERUND)
+    if stemmed is None:
+        word = remove_ending(word, rv, REFLEXIVE) or word
+        stemmed = remove_ending(word, rv, ADJECTIVE)
+        if stemmed is not None:
+            stemmed = remove_ending(stemmed, rv, PARTICIPLE) or stemmed
+        else:
+            stemmed = (remove_ending(word, rv, VERB)
+                       or remove_ending(word, rv, NOUN))
+    if stemmed is not None:
+        word = stemmed
+    # Шаг 2.
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    # Шаг 3.
+    for ending in sorted(DERIVATIONAL, key=len, reverse=True):
+        if word.endswith(ending):
+            if len(word) - len(ending) >= r2:
+                word = word[:-len(ending)]
+            break
+    # Шаг 4.
+    superlative = remove_ending(word, rv, ((), ('ейш', 'ейше')))
+    if superlative is not None:
+        word = superlative
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif superlative is None and word.endswith('ь') and len(word) > rv:
+        word = word[:-1]
+    return word
+
+
+def stem_words(text):
+    """
+    Основы слов текста в нижнем регистре.
+    """
+    return [stem(word) for word in WORD_RE.findall(text or '')]
@@ -0,0 +1,158 @@
+from http import HTTPStatus
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import include, path, reverse
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Post, User
+from .backends import get_backend
+from .stemmer import stem
+
+# Адреса проекта вместе с адресами панели отладки: yatube.urls
+# добавляет их только при DEBUG, а тесты запускаются без него.
+urlpatterns = [
+    path('__debug__/', include('debug_toolbar.urls')),
+    path('', include('yatube.urls')),
+]
+
+
+class StemmerTest(TestCase):
+    def test_stem(self):
+        words = {
+            'книги': 'книг',
+            'красивая': 'красив',
+            'важнейшее': 'важн',
+            'длинная': 'длин',
+            'программирования': 'программирован',
+            'программирование': 'программирован',
+            'кошками': 'кошк',
+            'бегавшая': 'бега',
+            'одевается': 'одева',
+            'Ёлки': 'елк',
+            'Django': 'django',
+        }
+        for word, expected in words.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_user')
+        cls.in_title = Post.objects.create(
+            title='Кошки', text='Про домашних животных', author=cls.user)
+        cls.in_text = Post.objects.create(
+            text='Соседская кошка любит рыбу', author=cls.user)
+        cls.other = Post.objects.create(text='Собаки и волки',
+                                        author=cls.user)
+        cls.comment = Comment.objects.create(
+            post=cls.other, author=cls.user, text='Моя кошка против')
+
+    def setUp(self):
+        cache.clear()
+        self.backend = get_backend()
+
+    def search(self, query):
+        return list(self.backend.search_posts(Post.objects.all(), query))
+
+    def test_ranked_with_stemming(self):
+        """
+        Разные формы слова находят пост, совпадение
+        в заголовке выше совпадения в тексте.
+        """
+        for query in ('кошка', 'кошками', 'КОШКУ'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query),
+                                 [self.in_title, self.in_text])
+        self.assertEqual(self.search('кошка рыбой'), [self.in_text])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_index_updated_incrementally(self):
+        post = Post.objects.create(text='Новые кошки', author=self.user)
+        self.assertIn(post, self.search('кошка'))
+        post.text = 'Новые собаки'
+        post.save()
+        self.assertNotIn(post, self.search('кошка'))
+        self.assertIn(post, self.search('собака'))
+        post.delete()
+        self.assertNotIn(post, self.search('собака'))
+
+    def test_comments(self):
+        comments = Comment.objects.all()
+        self.assertEqual(
+            list(self.backend.search_comments(comments, 'кошки')),
+            [self.comment])
+        Comment.objects.get(pk=self.comment.pk).delete()
+        self.assertEqual(
+            list(self.backend.search_comments(comments, 'кошки')), [])
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.search('кошка')
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM search_post')
+        self.assertEqual(self.search('кошка'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Постов в индексе: 3, комментариев: 1',
+                      out.getvalue())
+        self.assertEqual(self.search('кошка'),
+                         [self.in_title, self.in_text])
+
+    @override_settings(
+        SEARCH_BACKEND='search.backends.simple.SimpleSearchBackend')
+    def test_simple_backend(self):
+        self.assertEqual(set(self.search('кошки')),
+                         {self.in_title, self.in_text})
+
+    def test_search_page(self):
+        client = Client()
+        url = reverse('search:search')
+        response = client.get(url, {'q': 'кошки'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.in_title, self.in_text])
+        response = client.get(url, {'q': 'кошки', 'type': 'comments'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.comment])
+        response = client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_api_search(self):
+        """
+        ?search= возвращает посты по релевантности постранично.
+        """
+        client = APIClient()
+        response = client.get('/api/v1/posts/',
+                              {'search': 'кошки', 'limit': 1})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['id'],
+                         self.in_title.id)
+        response = client.get(response.data['next'])
+        self.assertEqual(response.data['results'][0]['id'], self.in_text.id)
+
+    @override_settings(DEBUG=True, ROOT_URLCONF=__name__)
+    def test_index_with_debug_toolbar(self):
+        """
+        Индекс обновляется при включённой панели отладки:
+        её учёт SQL не поддерживает executemany.
+        """
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(reverse('posts:post_create'),
+                               data={'text': 'Рыжая кошка'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = client.post(
+            reverse('posts:add_comment', args=[self.in_text.pk]),
+            data={'text': 'Кошка спит'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertEqual(len(self.search('рыжая')), 1)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.utils.http import urlencode
+
+from posts.models import Comment, Post
+from .backends import get_backend
+
+KINDS = ('posts', 'comments')
+
+
+def search(request):
+    """
+    Поиск по постам и комментариям, результаты по релевантности.
+    """
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('type')
+    if kind not in KINDS:
+        kind = KINDS[0]
+    backend = get_backend()
+    if kind == 'posts':
+        results = backend.search_posts(
+            Post.objects.select_related('author', 'group').defer('text'),
+            query)
+    else:
+        results = backend.search_comments(
+            Comment.objects.select_related('author'), query)
+    paginator = Paginator(results, settings.POSTS_ON_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.page_range = paginator.get_elided_page_range(page_obj.number)
+    context = {
+        'query': query,
+        'kind': kind,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query, 'type': kind}) + '&',
+    }
+    return render(request, 'search/search.html', context)
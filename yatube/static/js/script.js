@@ -1,24 +1,36 @@
-const maxWords = 10
 const className = '.article'
-function hide(el) {
-    el = el.closest(className)
-    contents = $(el).contents()
-    let words = contents[0].textContent.trim().split(' ')
-    let head = words.slice(0, maxWords)
-    let tail = words.slice(maxWords)
-
-    if (tail.length) {
-        let headstr = head.join(' ')
-        let tailstr = tail.join(' ')
-        $(el).html(headstr + '<a href="javascript: void 0" onclick="show(this)">&nbsp;Показать детали&nbsp;</a><span style="display:none">' + tailstr + '</span>')
+$(document).on('click', '.article-toggle', function(event) {
+    event.preventDefault()
+    let link = $(this)
+    let text = link.closest(className).find('.article-text')
+    if (link.data('excerpt') !== undefined) {
+        text.html(link.data('excerpt'))
+        link.removeData('excerpt').html('&nbsp;Показать детали&nbsp;')
+        return
     }
-};
-
-function show(el) {
-    let art = $(el).closest(className)
-    let contents = art.contents()
-    let head = contents[0].textContent
-    let tail = contents[2].textContent
-    let data = head + ' ' + tail + '<a href="javascript: void 0" onclick="hide(this)">&nbsp;Скрыть&nbsp;</a>'
-    $(art).html(data)
-};
\ No newline at end of file
+    $.get(link.data('url')).done(function(data) {
+        link.data('excerpt', text.html())
+        text.html(data)
+        link.html('&nbsp;Скрыть&nbsp;')
+    }).fail(function() {
+        window.location = link.attr('href')
+    })
+});
+$(document).on('submit', '.like-form', function(event) {
+    event.preventDefault()
+    let form = $(this)
+    $.ajax({
+        url: form.attr('action'),
+        method: 'POST',
+        data: form.serialize(),
+        dataType: 'json',
+        headers: {'X-Requested-With': 'XMLHttpRequest'},
+    }).done(function(data) {
+        form.find('.likes-qty').text(data.likes_count)
+        form.find('.like-icon')
+            .toggleClass('fi-xnsuxl-heart-solid', data.liked)
+            .toggleClass('fi-xnluxl-heart', !data.liked)
+    }).fail(function() {
+        form.get(0).submit()
+    })
+});
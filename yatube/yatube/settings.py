@@ -48,6 +48,8 @@ INSTALLED_APPS = [
     'sorl.thumbnail',
     'likes.apps.PostLikesConfig',
     'api.apps.ApiConfig',
+    'search.apps.SearchConfig',
+    'benchmarks.apps.BenchmarksConfig',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -56,10 +58,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -70,7 +74,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.profiling.ProfilingDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -87,15 +91,129 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Профилирование запросов (core.profiling): доля запросов, по которым
+# пишется запись в PROFILING_LOG (0 — не писать), и порог в
+# миллисекундах, после которого запрос к базе попадает в
+# SLOW_QUERY_LOG (None — не писать).
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.05))
+SLOW_QUERY_MS = 100
+LOG_DIR = os.getenv('LOG_DIR', os.path.join(BASE_DIR, 'logs'))
+PROFILING_LOG = os.path.join(LOG_DIR, 'profiling.log')
+SLOW_QUERY_LOG = os.path.join(LOG_DIR, 'slow_queries.log')
+
+# Метрики Prometheus (core.metrics): процессы пишут их в файлы
+# METRICS_DIR не чаще раза в METRICS_FLUSH_INTERVAL секунд, /metrics
+# складывает файлы всех процессов. Каталог очищают при развёртывании.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(BASE_DIR, 'metrics'))
+METRICS_FLUSH_INTERVAL = 1
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS',
+                                '127.0.0.1,::1').split(',')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'profiling': {
+            'class': 'core.profiling.RotatingFileHandler',
+            'filename': PROFILING_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message',
+            'delay': True,
+        },
+        'slow_queries': {
+            'class': 'core.profiling.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['profiling'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.profiling.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# База задаётся переменными окружения: DB_ENGINE ('sqlite3' по умолчанию,
+# 'postgresql' или путь к бэкенду), DB_NAME, DB_USER, DB_PASSWORD,
+# DB_HOST, DB_PORT. Реплика для чтения включается переменной
+# DB_REPLICA_NAME или DB_REPLICA_HOST, остальные параметры берутся
+# у основной базы, если не заданы DB_REPLICA_*.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite3')
+if '.' not in DB_ENGINE:
+    DB_ENGINE = f'django.db.backends.{DB_ENGINE}'
+
+
+def database(prefix, name):
+    config = {
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv(f'{prefix}_NAME', name),
+        # Соединение остаётся открытым между запросами.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
+    if 'sqlite3' not in DB_ENGINE:
+        for key in ('USER', 'PASSWORD', 'HOST', 'PORT'):
+            config[key] = os.getenv(f'{prefix}_{key}',
+                                    os.getenv(f'DB_{key}', ''))
+    return config
+
+
+DATABASES = {
+    'default': database('DB', os.path.join(BASE_DIR, 'db.sqlite3')),
+}
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = database('DB_REPLICA',
+                                    os.getenv('DB_NAME', 'yatube'))
+    # В тестах реплика — то же соединение, что и основная база.
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['core.db.PrimaryReplicaRouter']
+# Перед запросом постоянные соединения проверяются запросом SELECT 1,
+# оборванное соединение закрывается и открывается заново.
+DB_HEALTH_CHECKS = True
+# Чтения представлений этих модулей в GET-запросах идут на реплику.
+DB_REPLICA_VIEWS = ('posts.views', 'api.views')
+# После изменяющего запроса клиент читает из основной базы столько
+# секунд (cookie и, для авторизованных, метка в кэше).
+DB_REPLICA_STICKY_SECONDS = 10
+# Наибольшее ожидаемое отставание реплики: страницы, версии кэша
+# которых сброшены позже, читаются из основной базы.
+DB_REPLICA_MAX_LAG = 5
+# PRAGMA для каждого нового соединения SQLite. WAL позволяет читать во
+# время записи, busy_timeout (мс) — ждать блокировку вместо ошибки
+# «database is locked», synchronous=NORMAL в режиме WAL не теряет
+# целостность при падении процесса. Отдельные значения меняются
+# переменной SQLITE_PRAGMAS, например 'mmap_size=0,synchronous=full'.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    # Отрицательный размер — в килобайтах на соединение.
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
 }
+SQLITE_PRAGMAS.update(
+    pragma.strip().split('=', 1)
+    for pragma in os.getenv('SQLITE_PRAGMAS', '').split(',')
+    if pragma.strip()
+)
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,11 +264,40 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Кэш общий для всех процессов сервера: версии страниц и фрагментов
+# должны совпадать во всех воркерах. CACHE_BACKEND — 'file'
+# (по умолчанию), 'db' (после manage.py createcachetable), 'memcached',
+# 'locmem' (только для одного процесса) или путь к классу бэкенда.
+CACHE_BACKENDS = {
+    'file': ('core.cache.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache',
+           'yatube_cache'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache',
+                  '127.0.0.1:11211'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache',
+               'yatube'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS.get(
+    os.getenv('CACHE_BACKEND', 'file'),
+    (os.getenv('CACHE_BACKEND'), None)
+)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_LOCATION),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'yatube'),
     }
 }
+if 'memcached' not in CACHE_BACKEND:
+    # Memcached передаёт OPTIONS клиенту и вытесняет записи сам.
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+    }
+# Тесты работают с кэшем во временном каталоге.
+TEST_RUNNER = 'core.runner.TestRunner'
+# Страницы для анонимных пользователей, сбрасываются сигналами.
+PAGE_CACHE_TIMEOUT = 60 * 10
 
 INTERNAL_IPS = [
     '127.0.0.1',
@@ -159,6 +306,51 @@ INTERNAL_IPS = [
 QTY_WORDS = 10
 QTY_POSTS = 13
 POSTS_ON_PAGE = 10
+# 'cursor' — пагинация по ключу (pub_date, id), 'pages' — по номерам.
+POSTS_PAGINATION = 'cursor'
+
+# Авторы с большим числом подписчиков не раскладывают посты
+# по лентам при публикации, лента дочитывает их при открытии.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+TIMELINE_CACHE_TIMEOUT = 60 * 60
+# Счётчики автора на страницах поста и профайла, сбрасываются сигналами.
+AUTHOR_STATS_CACHE_TIMEOUT = 60 * 60
+
+# Превью изображений постов создаются пулом фоновых потоков
+# после сохранения поста; 0 — создавать сразу в процессе запроса.
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+POST_THUMBNAIL_WORKERS = 2
+
+# Лайки поста, получающего больше LIKES_BUFFER_HOT_RATE лайков в минуту,
+# пишутся в журнал и сбрасываются в базу пачками раз в
+# LIKES_FLUSH_INTERVAL секунд. None выключает буфер, 0 — буфер для всех.
+LIKES_BUFFER_HOT_RATE = 60
+LIKES_FLUSH_INTERVAL = 5
+LIKES_FLUSH_BATCH_SIZE = 500
+LIKES_JOURNAL_DIR = os.path.join(BASE_DIR, 'likes_journal')
+# fsync после каждой записи: журнал переживает и сбой питания.
+LIKES_JOURNAL_FSYNC = False
+
+# Популярные посты: лайки и комментарии за HOT_SCORE_WINDOW с весом,
+# который убывает вдвое за HOT_SCORE_HALF_LIFE. Оценки пересчитывает
+# команда update_hot_scores (по cron), возраст события округляется
+# до HOT_SCORE_BUCKET.
+HOT_SCORE_HALF_LIFE = timedelta(hours=12)
+HOT_SCORE_WINDOW = timedelta(days=3)
+HOT_SCORE_BUCKET = timedelta(hours=1)
+HOT_SCORE_LIKE_WEIGHT = 1
+HOT_SCORE_COMMENT_WEIGHT = 3
+
+# Поиск по постам и комментариям. SQLiteFTSBackend хранит индекс
+# в таблицах FTS5 базы, SimpleSearchBackend ищет без индекса
+# (для других баз данных).
+SEARCH_BACKEND = os.getenv(
+    'SEARCH_BACKEND',
+    'search.backends.sqlite.SQLiteFTSBackend' if 'sqlite3' in DB_ENGINE
+    else 'search.backends.simple.SimpleSearchBackend'
+)
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -171,6 +363,8 @@ REST_FRAMEWORK = {
 
     'PAGE_SIZE': 10
 }
+# Наибольшее число объектов в запросе POST .../bulk/.
+API_BULK_MAX_ITEMS = 500
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 